@@ -6,17 +6,23 @@ Created on Mon Feb 10 01:17:28 2025
 Data from Judd et al., 2024
 """
 
-import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator
 import numpy as np
-import matplotlib.transforms as transforms
 import matplotlib.patches as mpatches
 import matplotlib.ticker as ticker
+from climax_datasets import load_excel
+from climax_plotting import plot_decimated, fill_between_decimated
+from climax_plotting import TimescaleOverlay, PHANEROZOIC_PERIODS, ICE_PERIODS
 
 # Load data from an Excel file
+# The Excel file is parsed once and saved to PhanDA_GMSTandCO2_percentiles.xlsx.npz;
+# the next runs only read the columns below from it (until the Excel file changes)
 datas = "PhanDA_GMSTandCO2_percentiles.xlsx"
-data = pd.read_excel(datas)
+columns = ['Period', 'Epoch', 'Stage', 'LowerAge', 'UpperAge', 'AverageAge',
+           'GMST_05', 'GMST_16', 'GMST_50', 'GMST_84', 'GMST_95',
+           'CO2_05', 'CO2_16', 'CO2_50', 'CO2_84', 'CO2_95']
+data = load_excel(datas, columns=columns)
 
 # Extract relevant columns from the dataset
 period = data['Period']
@@ -40,10 +46,14 @@ co295 = data['CO2_95']
 fig, (ax2, ax1) = plt.subplots(2, 1, figsize=(25.25, 13.75))  
 plt.rcParams["font.family"] = "Times New Roman"
 
+# Curves and bands only draw the samples visible at the export resolution
+# (min/max per pixel column), whatever the number of rows of the dataset
+dpi = 300  # Resolution of plt.savefig
+
 # === CO2 Concentration Plot (ax2) ===
-ax2.plot(agemean, co250, color="black", linestyle='-', linewidth=3, alpha=1, label='50')
-ax2.fill_between(agemean, co216, co284, color="black", alpha=0.35, label='16 - 84')
-ax2.fill_between(agemean, co205, co295, color="black", alpha=0.25, label='05 - 95')
+plot_decimated(ax2, agemean, co250, color="black", linestyle='-', linewidth=3, alpha=1, label='50', dpi=dpi)
+fill_between_decimated(ax2, agemean, co216, co284, color="black", alpha=0.35, label='16 - 84', dpi=dpi)
+fill_between_decimated(ax2, agemean, co205, co295, color="black", alpha=0.25, label='05 - 95', dpi=dpi)
 
 # Configure X and Y-axis for CO2 (ax2)
 ax2.set_xticks(np.arange(0, 550, 50))  
@@ -70,9 +80,9 @@ ax2.invert_xaxis()
 ax1.invert_xaxis()
 
 # === Global Mean Surface Temperature (GMST) Plot (ax1) ===
-ax1.plot(agemean, gmst50, color="red", linestyle='-', linewidth=3, alpha=1, label='50')
-ax1.fill_between(agemean, gmst16, gmst84, color="red", alpha=0.35, label='16 - 84')
-ax1.fill_between(agemean, gmst05, gmst95, color="red", alpha=0.25, label='05 - 95')
+plot_decimated(ax1, agemean, gmst50, color="red", linestyle='-', linewidth=3, alpha=1, label='50', dpi=dpi)
+fill_between_decimated(ax1, agemean, gmst16, gmst84, color="red", alpha=0.35, label='16 - 84', dpi=dpi)
+fill_between_decimated(ax1, agemean, gmst05, gmst95, color="red", alpha=0.25, label='05 - 95', dpi=dpi)
 
 # Configure axis labels for GMST (ax1)
 ax1.set_xlabel("Age (Ma)", fontsize=25)  
@@ -103,56 +113,20 @@ legend2.get_title().set_fontweight('bold')
 ax1.grid(True, which='major', axis='both', linestyle='--', color='gray', alpha=0.5, zorder=1)
 ax2.grid(True, which='major', axis='both', linestyle='--', color='gray', alpha=0.5, zorder=1)
 
-# Create transformation objects for positioning rectangles
-trans1 = transforms.blended_transform_factory(ax1.transData, ax1.transAxes)
-trans2 = transforms.blended_transform_factory(ax2.transData, ax2.transAxes)
-
-# Function to add colored rectangles and labels for geological time periods
-def add_time_rectangles(ax, trans):
-    rect_params = [
-        (0, 2.58, 'lightyellow', "Q"),
-        (2.58, 20.46, 'yellow', "Neogene"),
-        (23.04, 42.96, 'coral', "Paleogene"),
-        (66, 77.1, 'limegreen', "Cretaceous"),
-        (143.1, 58.3, 'dodgerblue', "Jurassic"),
-        (201.4, 50.5, 'purple', "Triassic"),
-        (251.9, 47, 'orangered', "Permian"),
-        (298.9, 59.96, 'turquoise', "Carboniferous"),
-        (358.86, 60.76, 'peru', "Devonian"),
-        (419.62, 23.48, 'aquamarine', "Silurian"),
-        (443.1, 43.75, 'mediumseagreen', "Ordovician")]
-    
-    for x, width, color, name in rect_params:
-        rect = mpatches.Rectangle((x, 0), width=width, height=0.09, transform=trans, color=color, alpha=1, zorder=2)
-        ax.add_patch(rect)
-        x_center = x + width / 2  
-        ax.text(x_center, 0.04, name, transform=trans, ha='center', va='center', 
-                fontsize=19, fontweight='bold', color='black')
-
-# Function to add ice period indicators
-def ice_rects(ax, trans, legend_patches):
-    rectice = [(0, 34, 'aqua'), (260, 110, 'aqua'), (430, 30, 'aqua')]
-    
-    for x, width, color in rectice:
-        rect = mpatches.Rectangle((x, 0.093), width=width, height=0.05, transform=trans, color=color, alpha=1, zorder=3)
-        ax.add_patch(rect)
-
-    # Add legend for ice periods only once
-    if not legend_patches:
-        legend_patches.append(mpatches.Patch(color="aqua", alpha=1, label="Ice Periods"))
-
-legend_patches = []
-
-# Apply functions to both subplots
-ice_rects(ax1, trans1, legend_patches)
-ice_rects(ax2, trans2, legend_patches)
-fig.legend(handles=legend_patches, bbox_to_anchor=(0.145, 0.487), prop={'size': 18, 'weight': 'bold'}, frameon=True)
+# Geological periods and ice periods (tables in climax_plotting.py, or load_timescale for a text file)
+# Each overlay is built once and drawn as a single collection of rectangles per subplot
+periods = TimescaleOverlay(PHANEROZOIC_PERIODS)
+ice_periods = TimescaleOverlay(ICE_PERIODS)
 
-add_time_rectangles(ax1, trans1)
-add_time_rectangles(ax2, trans2)
+for ax in (ax1, ax2):
+    ice_periods.draw(ax, zorder=3)
+    periods.draw(ax, zorder=2, fontsize=19, fontweight='bold')
+
+legend_patches = [mpatches.Patch(color="aqua", alpha=1, label="Ice Periods")]
+fig.legend(handles=legend_patches, bbox_to_anchor=(0.145, 0.487), prop={'size': 18, 'weight': 'bold'}, frameon=True)
 
 # Adjust layout to prevent overlap
 plt.tight_layout()
 
 # Save the figure 
-#plt.savefig('500Ma_GMST_CO2.png', dpi=300, bbox_inches='tight')
+#plt.savefig('500Ma_GMST_CO2.png', dpi=dpi, bbox_inches='tight')
@@ -12,13 +12,15 @@ import numpy as np
 import matplotlib.pyplot as plt
 from cmcrameri import cm
 import matplotlib.patches as mpatches
+from climax_model import build_temperature_field, ScenarioSweep, ClimaxIntegrator
+from climax_model import ZoneTable, DEFAULT_ZONE_TABLE, DEFAULT_ZONE_RECTANGLES
+from climax_model import paint_zone_map, load_zone_map, load_zone_rectangles
 
 # Creating variables
 lat   = np.linspace(0, 49, 50)
 lon   = np.linspace(0, 49, 50)  
 depth = np.linspace(0, 9, 10)
 time  = np.linspace(0, 364, 365)
-temperature = np.zeros((len(lon), len(lat), len(depth), len(time)))
 
 lon, lat, depth, time
 
@@ -35,8 +37,10 @@ depth_effect = np.linspace(5, 0, len(depth))                             # Tempe
 seasonvar    = 10 * np.sin(2 * np.pi * np.arange(len(time)) / len(time)) # Summer-winter variation
 
 # Creating the temperature variable
-for t in range(len(time)):
-    temperature[:, :, :, t] = (15 + seasonvar[t] + lat_effect[:, None, None] + depth_effect[None, None, :])
+# The 4-D array temperature[lon, lat, depth, time] is never stored: the effects are
+# only broadcast together for the slice we ask for, e.g. temperature[:, :, 5, 12]
+# Use dtype=np.float32 to halve the memory of each slice
+temperature = build_temperature_field(lat_effect, depth_effect, seasonvar, len(lat), base=15, dtype=np.float64)
 
 #%% Temperature checks
 # 1. Geographical cross-section
@@ -58,23 +62,20 @@ plt.grid()
 #%% CO2 forcing
 # pCO2 concentrations in ppm
 pCO2_levels = [560]
-temperature_forcings = []
 
-# Conversion into warming factors
-def calculate_forcing(pCO2):
-    baseline_pCO2 = 280  # Reference level (pre-industrial)
-    # Approximation: doubling pCO₂ results in about a 3°C increase
-    forcing_factor = 3 * np.log2(pCO2 / baseline_pCO2)
-    return forcing_factor
+# Conversion into warming factors: calculate_forcing (climax_model.py)
+# Approximation: doubling pCO₂ results in about a 3°C increase
+# Each scenario only stores its forcing; the base temperature field is shared
+# The sweep runs in this process (workers=None): the scenarios are cheap, and worker
+# processes would need this script to be run under `if __name__ == '__main__':`
+sweep = ScenarioSweep(temperature, pCO2_levels, depth=5, time=12, workers=None).run()
 
-# Add a forced temperature array
-temperature_forced = np.zeros_like(temperature)
+for pCO2, mean in zip(pCO2_levels, sweep.global_mean):
+    print(f"pCO2 = {pCO2} ppm: global mean temperature (depth 5, day 12) = {mean:.2f}°C")
 
-# Apply forcings for each pCO2 level
-for pCO2 in pCO2_levels:
-    forcing = calculate_forcing(pCO2)
-    temperature_forced[:, :, :, :] = temperature + forcing  # Apply the forcing
-    temperature_forcings.append(temperature_forced.copy())  # Save each scenario
+# Apply forcings for each pCO2 level (lazy fields, no copy of the 4-D array)
+temperature_forcings = [sweep.field(i) for i in range(len(sweep))]  # Save each scenario
+temperature_forced = temperature_forcings[-1]
 
 # Visualization of forced temperature for a given day and depth
 for i, (pCO2, temp_forced) in enumerate(zip(pCO2_levels, temperature_forcings)):
@@ -89,33 +90,19 @@ plt.tight_layout()
 
 #%% Improved geographical zones
 # 0 = ocean, 1 = forest, 2 = desert, 3 = continent, 4 = polar ice cap, 5 = tropics
-geo_map = np.zeros((len(lon), len(lat)))
-
-# Polar ice caps
-geo_map[:2, :]      = 4  # Arctic zone in the north
-geo_map[45:, :]     = 4  # Antarctic in the south
-geo_map[1:8, 15:21] = 4  # Greenland
-
-# Oceans
-#geo_map[:, :] = 0    # Default fill with oceans
-
-# Continents
-geo_map[5:20, 5:15]   = 3  # North America
-geo_map[20:35, 12:18] = 3  # South America
-geo_map[5:18, 25:45]  = 3  # Europe-Asia
-geo_map[20:35, 20:30] = 3  # Africa
-geo_map[30:40, 35:45] = 3  # Southeast Asia
-geo_map[35:45, 38:45] = 3  # Australia
-
-# Deserts
-geo_map[15:20, 22:28] = 2  # Sahara
-geo_map[32:36, 38:44] = 2  # Australian desert
-geo_map[10:15, 30:35] = 2  # Gobi desert
-
-# Forests
-geo_map[25:30, 15:20] = 1  # Amazon
-geo_map[22:28, 35:40] = 1  # Borneo and Sumatra
-geo_map[25:35, 25:30] = 1  # Congo forest
+# The zones are painted from rectangles (DEFAULT_ZONE_RECTANGLES in climax_model.py):
+# polar ice caps, continents, deserts and forests, the rest of the map being ocean
+# To use your own world, set a file with `zone row_start row_stop col_start col_stop name`
+# lines (load_zone_rectangles) or a 2-D grid of zone ids (.npy or .txt, load_zone_map)
+zone_rectangles_file = None  # e.g. 'Zones_rectangles.txt'
+zone_map_file        = None  # e.g. 'Zones_map.npy'
+
+if zone_map_file is not None:
+    geo_map = load_zone_map(zone_map_file, (len(lon), len(lat)))
+elif zone_rectangles_file is not None:
+    geo_map = paint_zone_map((len(lon), len(lat)), load_zone_rectangles(zone_rectangles_file))
+else:
+    geo_map = paint_zone_map((len(lon), len(lat)), DEFAULT_ZONE_RECTANGLES)
 
 # Tropics (approximation of the Tropics of Cancer and Capricorn)
 # geo_map[10:15, :] = 5  # Tropic of Cancer
@@ -134,23 +121,16 @@ plt.grid(linestyle=':')
 
 #%% Parameters to adjust temperature based on geographical zones
 
-temperature2 = np.zeros((len(lon), len(lat), len(depth), len(time)))
+# Zone modifiers: zone id -> (scale, offset) (DEFAULT_ZONE_TABLE in climax_model.py)
+# To use your own values, set a file with `zone scale offset name` lines
+zone_table_file = None  # e.g. 'Zones_table.txt'
+zone_table = ZoneTable.from_file(zone_table_file) if zone_table_file else ZoneTable(DEFAULT_ZONE_TABLE)
 
-for lat2 in range(len(lat)):
-    for lon2 in range(len(lon)):
-        zone = geo_map[lon2, lat2]
-        if zone == 0:    # Ocean
-            temperature2[lon2, lat2, :, :] *= 0.9   # More stable temperature (slight reduction in variations)
-        elif zone == 1:  # Forest
-            temperature2[lon2, lat2, :, :] *= 0.95  # Moderate temperature, less variation
-        elif zone == 2:  # Desert
-            temperature2[lon2, lat2, :, :] += 5     # Higher temperature to simulate desert conditions
-        elif zone == 3:  # Continent
-            temperature2[lon2, lat2, :, :] += 2     # Moderate temperature, less variation
-        elif zone == 4:  # Polar ice cap
-            temperature2[lon2, lat2, :, :] -= 15    # Colder temperature to simulate polar conditions
+# The modifiers are applied to an array of zeros, so only the offsets change the temperature
+# (Desert +5, Continent +2, Polar ice cap -15); one lookup over geo_map instead of a loop per cell
+temperature2 = zone_table.apply(np.zeros(geo_map.shape), geo_map)
 
-temperature_forced += temperature2
+temperature_forced = temperature_forced.add_term(('lon', 'lat'), temperature2)
 
 #%% Map of geographical zone contours and temperature
 plt.figure(figsize=(13.5, 6.25))
@@ -181,3 +161,16 @@ patches = [mpatches.Patch(color=color, label=label) for color, label in zip(zone
 plt.legend(handles=patches, loc='lower left', title="Geographical zones")
 
 #plt.savefig('Simul_840ppm_3X.png', dpi=300, bbox_inches='tight')
+
+#%% Time-stepping simulation
+# Instead of the fixed 365-day cube, the temperature relaxes day after day towards the
+# forced temperature with zones (relaxation time: 5 days at the surface to 60 days at depth)
+# The results are written to a compressed NetCDF file as the run goes (one record per 5 days)
+# and a checkpoint allows to restart an interrupted run (restart=True)
+run_time_stepping = False  # Set to True to run the simulation
+n_years = 10               # Length of the simulation
+
+if run_time_stepping:
+    integrator = ClimaxIntegrator(temperature_forced, substeps=4)
+    integrator.run(n_years * len(time), 'CLIMAX_560ppm.nc', output_every=5,
+                   checkpoint_path='CLIMAX_560ppm_checkpoint.npz', checkpoint_every=10, restart=True)
@@ -12,102 +12,53 @@ Color Map from Crameri et al., 2020
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
-from netCDF4 import Dataset
 import numpy as np
 from cmcrameri import cm  # Crameri et al., 2020 (e.g., bibliography)
 from scipy.interpolate import griddata
+from climax_grid import create_paleogeography_boundaries, prepare_grid
+from climax_netcdf import open_dataset
+from climax_maps import projected_grid
 
 #%% Load data
 
-nc_tas = Dataset('tas_CESM1.2-CAM5_deepmip-eocene-p1-x9_v1.0.mean.nc', 'r')
-print("Variables disponibles dans le fichier NetCDF :")
-for variable in nc_tas.variables:
-    print(variable)
-    
-nc_orog = Dataset('orog_CESM1.2-CAM5_deepmip-eocene-p1-x9_v1.0.nc', 'r')
-print("\n", "Variables disponibles dans le fichier NetCDF :")
-for variable in nc_orog.variables:
-    print(variable)
+# Each file is opened once; listing the variables only reads the metadata
+nc_tas = open_dataset('tas_CESM1.2-CAM5_deepmip-eocene-p1-x9_v1.0.mean.nc')
+nc_tas.describe()
+
+nc_orog = open_dataset('orog_CESM1.2-CAM5_deepmip-eocene-p1-x9_v1.0.nc')
+print()
+nc_orog.describe()
     
 #%% Extract variables
 
-tas      = nc_tas.variables['tas'][:]       # Near air surface temperature
-lat_tas  = nc_tas.variables['lat'][:]       # TAS Latitude
-lon_tas  = nc_tas.variables['lon'][:]       # TAS Longitude
+tas      = nc_tas['tas'][0]                 # Near air surface temperature (first time step only)
+lat_tas  = nc_tas['lat'][:]                 # TAS Latitude
+lon_tas  = nc_tas['lon'][:]                 # TAS Longitude
 
-orog     = nc_orog.variables['orog'][:]     # Altitude
-lat_orog = nc_orog.variables['lat'][:]      # OROG Latitude
-lon_orog = nc_orog.variables['lon'][:]      # OROG Longitude
+orog     = nc_orog['orog'][:]               # Altitude
+lat_orog = nc_orog['lat'][:]                # OROG Latitude
+lon_orog = nc_orog['lon'][:]                # OROG Longitude
 
-### Conversion K => °C
-tas = tas - 273.15
+#%% Prepare the grids (one float32 buffer per variable, see prepare_grid in climax_grid.py)
+# Masked values become NaN, and a column at lon[0] + 360 (mean of the last and first columns)
+# avoids a white line (without data) between the last longitude and 360
+# The 1-D coordinates are used directly by contour/contourf (no meshgrid)
 
-#%% To avoid a white line (without data) between longitude 357.5 and 360
+### TAS: conversion K => °C
+tas, lon_tas = prepare_grid(tas, lon_tas, kelvin=True)
 
-### TAS
-lon_tas  = np.insert(lon_tas, 144, 360)
-new_col_tas = (tas[:, :, 143] + tas[:, :, 0]) / 2 
-tas = np.concatenate((tas, new_col_tas[:, :, np.newaxis]), axis=2)
-
-### OROG
-lon_orog = np.insert(lon_orog, 144, 360)
-new_col_orog = (orog[:, 143] + orog[:, 0]) / 2  
-orog = np.hstack((orog, new_col_orog[:, np.newaxis]))
-
-
-#%% Create a regular grid
-
-### TAS
-lon_tas, lat_tas = np.meshgrid(lon_tas, lat_tas)
-       
-### OROG
-lon_orog, lat_orog = np.meshgrid(lon_orog, lat_orog)
-orog = np.where(orog < 2, np.nan, orog)             # Replace <2 values by nan in orog
+### OROG: replace <2 values by nan
+orog, lon_orog = prepare_grid(orog, lon_orog, mask_below=2)
 
 
 #%% Create Paleogeography boundaries for OROG
 
-def create_paleogeography_boundaries(orog):
-    """
-    Create a paleogeography matrix from the orography data.
-    Identifies land areas (where orog > 0) and marks the edges with specific values.
-    
-    Parameters:
-        orog (ndarray): 2D array representing the orography (altitude).
-    
-    Returns:
-        Y (ndarray): Processed 2D matrix with:
-            - Internal land marked with 5,
-            - Borders of land regions marked with 2,
-            - Other areas remain unchanged.
-    """
-    # Step 1: Create binary mask for land (1) and water (0)
-    Z = np.where(orog > 0, 1, 0)
-
-    # Step 2: Create an empty matrix to mark the borders
-    W = np.zeros_like(Z)
-
-    # Step 3: Loop through the matrix to identify border cells
-    rows, cols = Z.shape
-    for i in range(1, rows - 1):                            # Avoid boundaries of the matrix
-        for j in range(1, cols - 1):                        # Avoid boundaries of the matrix
-            if Z[i, j] == 1:                                # Land cell
-                                                            # Check the 8 neighbors for water (Z == 0)
-                if (Z[i-1, j] == 0 or Z[i+1, j] == 0 or     # Vertical neighbors
-                    Z[i, j-1] == 0 or Z[i, j+1] == 0 or     # Horizontal neighbors
-                    Z[i-1, j-1] == 0 or Z[i-1, j+1] == 0 or # Diagonal neighbors
-                    Z[i+1, j-1] == 0 or Z[i+1, j+1] == 0):  # Diagonal neighbors
-                    W[i, j] = 2                             # Mark border cells with 2
-
-    # Step 4: Merge W and Z into Y
-    Y = np.where(W == 2, W, Z)                              # Prioritize borders (2) over land (1)
-
-    # Step 5: Replace internal land cells (1) with 5
-    Y = np.where(Y == 1, 5, Y)
-
-    return Y
-
-Y = create_paleogeography_boundaries(orog)
+# create_paleogeography_boundaries (climax_grid.py) marks internal land with 5, the borders
+# of land regions with 2 and water with 0. All cells are checked at once and the longitude
+# wraps around the seam (cyclic_point=True: the last column, added by prepare_grid at
+# lon[0] + 360 with the mean of the last and first columns, is skipped when wrapping)
+# Use connectivity=4 to only check the vertical and horizontal neighbours
+Y = create_paleogeography_boundaries(orog, connectivity=8, cyclic_point=True)
 
 #%% Mapping
 
@@ -115,15 +66,19 @@ fig = plt.figure(figsize=(13.5, 6.25))
 ax = fig.add_subplot(1, 1, 1, projection=ccrs.Robinson(central_longitude=0))
 plt.rcParams["font.family"] = "Times New Roman"
 
+# Each grid is projected once (cached per grid and projection, see climax_maps.py)
+# and the layers are drawn in map coordinates
+grid_orog = projected_grid(lon_orog, lat_orog, ax.projection)
+grid_tas = projected_grid(lon_tas, lat_tas, ax.projection)
+
 ### OROG
-CS = ax.contour(lon_orog, lat_orog, Y, levels=[1.6], colors='k', alpha=1, linewidths=1, transform=ccrs.PlateCarree())
+CS = grid_orog.contour(ax, Y, levels=[1.6], colors='k', alpha=1, linewidths=1)
 
 ### TAS
 vmin = -10  # np.nanmin(tas) Minimum value (ignoring NaNs)
 vmax = 40   # np.nanmax(tas) Maximum value (ignoring NaNs)
 levels = np.arange(vmin, vmax + 1, 1)
-im_tas = ax.contourf(lon_tas, lat_tas, tas[0, :, :], transform=ccrs.PlateCarree(), 
-                     levels=levels, cmap=cm.batlow, extend='both', alpha=1)
+im_tas = grid_tas.contourf(ax, tas, levels=levels, cmap=cm.batlow, extend='both', alpha=1)
 
 # Colorbar for temperatures
 cbar_tas = plt.colorbar(im_tas, ax=ax, orientation='horizontal', shrink=0.8, fraction=0.06, pad=0.1)
@@ -132,8 +87,7 @@ cbar_tas.set_label("Near-Surface Air Temperature at 55 Ma (9X) (°C)", fontsize=
 
 # Add line and label for temperatures levels
 contour_levels = [-30, -20, -10, -5, 0, 10, 20, 30, 40, 50]
-contours = ax.contour(lon_tas, lat_tas, tas[0, :, :], levels=contour_levels, 
-                      colors='white', linewidths=1, transform=ccrs.PlateCarree())
+contours = grid_tas.contour(ax, tas, levels=contour_levels, colors='white', linewidths=1)
 ax.clabel(contours, inline=True, fmt='%d°C', fontsize=9, colors='white')
 
 ### Graphic label
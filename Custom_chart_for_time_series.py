@@ -8,66 +8,51 @@ Data : Hansen et al., 2013; Westerhold et al., 2020
 
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-
-# Two ways to import data; one manually and one with pandas
-time = []
-d13C = []
-d18O = []
-
-with open('Table_Westerhold.txt', 'r') as file:
-        
-    for line in file:
-        if not line.startswith('#'):
-            elements = line.split('\t')
-            try:
-                time.append(float(elements[0]))
-                d13C.append(float(elements[3]))
-                d18O.append(float(elements[6]))
-            except (IndexError, ValueError):
-                pass
+from climax_datasets import load_westerhold, load_excel
+from climax_timeseries import AgeSeries
+from climax_plotting import plot_decimated, TimescaleOverlay, OLIGOCENE_MIOCENE
 
+# Westerhold et al., 2020: columns 0 (time), 3 (δ13C) and 6 (δ18O) of the text table
+# The table is parsed once; the arrays are then reloaded from Table_Westerhold.txt.npz
+# (rebuilt automatically when the text file changes)
+time, d13C, d18O = load_westerhold('Table_Westerhold.txt')
+
+# Hansen et al., 2013: only the two columns used are loaded
+# (from Table_Hansen.xlsx.npz once the Excel file has been parsed)
 datas = "Table_Hansen.xlsx"
-data  = pd.read_excel(datas)
+data  = load_excel(datas, columns=['Time_H', 'delta_18O_H'])
+
+# Records indexed by age: the plotted window is chosen in Ma (binary search on the
+# sorted ages) instead of row numbers, and its arrays are views of the full records
+westerhold = AgeSeries(time, d18O=d18O, d13C=d13C)
+hansen     = AgeSeries(data['Time_H'], d18O=data['delta_18O_H'])
 
-time_hansen = data['Time_H']
-d18O_hansen = data['delta_18O_H']
+# Rolling average over 100 samples, computed only for the plotted window
+# (plus the 99 samples before it), e.g. windows=(50, 100), stats=('mean', 'std') for more
+age_window = (17, 34)  # Ma
+w = westerhold.rolling(*age_window, windows=100, stats=('mean',))
+h = hansen.rolling(*age_window, windows=100, stats=('mean',))
 
 #%%
 plt.figure(figsize=(13.5, 6.25))
 plt.rcParams["font.family"] = "Times New Roman"
-
-# Rolling average
-d18O_smooth = pd.Series(d18O).rolling(window=100).mean()
-d13C_smooth = pd.Series(d13C).rolling(window=100).mean()
-d18O_smooth = pd.Series(d18O).rolling(window=100).mean()
-d18O_hansen_smooth = pd.Series(d18O_hansen).rolling(window=100).mean()
-
-plt.plot(time[8750:16900], d18O[8750:16900], c='b', linewidth=0.75, alpha=0.25)
-plt.plot(time[8750:16900], d13C[8750:16900], c='r', linewidth=0.75, alpha=0.25)
-plt.plot(time[8750:16900], d18O_smooth[8750:16900], c='b', linewidth=1.25, label='δ18O [Westerhold et al., 2020]')
-plt.plot(time[8750:16900], d13C_smooth[8750:16900], c='r', linewidth=1.25, label='δ13C [Westerhold et al., 2020]')
-plt.plot(time_hansen[8072:16191], d18O_hansen[8072:16191], c = 'green', alpha=0.25, linewidth=0.75)
-plt.plot(time_hansen[8072:16191], d18O_hansen_smooth[8072:16191], c = 'green', linestyle='--', linewidth=1.25, label="δ18O [Hansen et al., 2013]")
+ax = plt.gca()
+
+# Only the samples visible at the export resolution are drawn (min/max per pixel column):
+# same figure, but the drawing time no longer depends on the length of the records
+dpi = 300  # Resolution of plt.savefig
+plot_decimated(ax, w.age, w['d18O'], c='b', linewidth=0.75, alpha=0.25, dpi=dpi)
+plot_decimated(ax, w.age, w['d13C'], c='r', linewidth=0.75, alpha=0.25, dpi=dpi)
+plot_decimated(ax, w.age, w['d18O_mean_100'], c='b', linewidth=1.25, label='δ18O [Westerhold et al., 2020]', dpi=dpi)
+plot_decimated(ax, w.age, w['d13C_mean_100'], c='r', linewidth=1.25, label='δ13C [Westerhold et al., 2020]', dpi=dpi)
+plot_decimated(ax, h.age, h['d18O'], c = 'green', alpha=0.25, linewidth=0.75, dpi=dpi)
+plot_decimated(ax, h.age, h['d18O_mean_100'], c = 'green', linestyle='--', linewidth=1.25, label="δ18O [Hansen et al., 2013]", dpi=dpi)
 
 plt.gca().invert_xaxis() # Invert the x-axis to have present time on the right
 
 # Add a transparent rectangle behind the graph for different geological periods
-plt.axvspan(time[11515],  time[16900], color='chocolate', alpha=1,   ymin = 0, ymax = 0.05)    # Oligocene
-plt.axvspan(time[8750],   time[11514], color='yellow',    alpha=1,   ymin = 0, ymax = 0.05)    # Miocene
-plt.axvspan(time[13910],  time[16900], color='chocolate', alpha=0.65, ymin = 0.05, ymax = 0.1) # Rupelian 
-plt.axvspan(time[11515],  time[13909], color='chocolate', alpha=0.5, ymin = 0.05, ymax = 0.1)  # Chattian
-plt.axvspan(time[10220],  time[11514], color='yellow',    alpha=0.65, ymin = 0.05, ymax = 0.1) # Aquitanian 
-plt.axvspan(time[8750],   time[10219], color='yellow',    alpha=0.5, ymin = 0.05, ymax = 0.1)  # Burdigalian
-plt.axvspan(time[13150],  time[14000], color='lightskyblue', alpha=0.5, ymin = 0.11, ymax = 1) # MOGI
- 
-plt.text(time[14100], -0.900, 'Oligocene',    ha='center', va='center', fontsize=15, color='black') 
-plt.text(time[10020], -0.900, 'Miocene',      ha='center', va='center', fontsize=15, color='black') 
-plt.text(time[15405], -0.670, 'Rupelian',     ha='center', va='center', fontsize=15, color='black') 
-plt.text(time[12712], -0.670, 'Chattian',     ha='center', va='center', fontsize=15, color='black') 
-plt.text(time[10867], -0.670, 'Aquitanian',   ha='center', va='center', fontsize=15, color='black') 
-plt.text(time[9485],  -0.670, 'Burdigalian',  ha='center', va='center', fontsize=15, color='black')
-plt.text(time[13575],  3.200, 'MOGI',         ha='center', va='center', fontsize=15, color='black')
+# Epochs, stages and the Mid-Oligocene Glacial Interval (MOGI), in Ma (table in climax_plotting.py)
+TimescaleOverlay(OLIGOCENE_MIOCENE).draw(ax, zorder=1, fontsize=15)
 
 # Title and axis labels
 plt.xlabel("Time (My)", fontsize=15)
@@ -102,6 +87,6 @@ for y in y_lines:
 # Legend
 plt.legend(loc="upper left", prop={'size': 9})
 
-#plt.savefig('d18O_d13C_comparison.png', dpi=300, bbox_inches='tight')
+#plt.savefig('d18O_d13C_comparison.png', dpi=dpi, bbox_inches='tight')
 
 
@@ -9,67 +9,58 @@ Data : from Steinig et al., 2024
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
-from netCDF4 import Dataset
 import numpy as np
 from cmcrameri import cm  # Crameri et al., 2020 (e.g., bibliography)
-from scipy.interpolate import griddata
-
-nc = Dataset('tos_IPSLCM5A2_deepmip-eocene-p1-x3_v1.0.time_series.nc', 'r')
-print("Variables disponibles dans le fichier NetCDF :")
-for variable in nc.variables:
-    print(variable)
-    
-nc2 = Dataset('orog_IPSLCM5A2_deepmip-eocene-p1-x3_v1.0.nc', 'r')
-print("\n", "Variables disponibles dans le fichier NetCDF :")
-for variable in nc.variables:
-    print(variable)
+from climax_grid import Regridder
+from climax_netcdf import open_dataset
+from climax_maps import projected_grid
+
+# Each file is opened once; listing the variables only reads the metadata
+nc = open_dataset('tos_IPSLCM5A2_deepmip-eocene-p1-x3_v1.0.time_series.nc')
+nc.describe()
+
+nc2 = open_dataset('orog_IPSLCM5A2_deepmip-eocene-p1-x3_v1.0.nc')
+print()
+nc2.describe()
 
 #%%
-test_tos  = nc.variables['tos']
-test_lat  = nc.variables['nav_lat']
-test_lon  = nc.variables['nav_lon']
-test_time = nc.variables['time_counter']
+test_tos  = nc['tos']
+test_lat  = nc['nav_lat']
+test_lon  = nc['nav_lon']
+test_time = nc['time_counter']
 print("tos=",test_tos, "\n")
 print("lat=",test_lat, "\n")
 print("lon=",test_lon, "\n")
 print("deptht=",test_time, "\n")
 
 #%%
-# Load data
-nc = Dataset('tos_IPSLCM5A2_deepmip-eocene-p1-x3_v1.0.time_series.nc', 'r')
-nc2 = Dataset('orog_IPSLCM5A2_deepmip-eocene-p1-x3_v1.0.nc', 'r')
-
-# Extract variables
-tos = nc.variables['tos'][:]            # Sea surface temperature
-lat = nc.variables['nav_lat'][:]        # Latitude
-lon = nc.variables['nav_lon'][:]        # Longitude
-time = nc.variables['time_counter'][:]  # Time
-orog = nc2.variables['orog'][:]         # Altitude
-lat_orog = nc2.variables['lat'][:]      # OROG Latitude
-lon_orog = nc2.variables['lon'][:]      # OROG Longitude
+# Extract variables (only the first month of the tos time series is read from the file)
+tos = nc['tos'][0]                      # Sea surface temperature
+lat = nc['nav_lat'][:]                  # Latitude
+lon = nc['nav_lon'][:]                  # Longitude
+time = nc['time_counter'][0]            # Time
+orog = nc2['orog'][:]                   # Altitude
+lat_orog = nc2['lat'][:]                # OROG Latitude
+lon_orog = nc2['lon'][:]                # OROG Longitude
 
 # Create a regular grid
 lon_reg, lat_reg = np.meshgrid(
     np.linspace(-180, 180, 360),  # 360 points in longitude
     np.linspace(-90, 90, 180))    # 180 points in latitude
 
-# Remap data with scipy.interpolate.griddata
-tos_remapped = griddata(
-    (lon.flatten(), lat.flatten()),  # Original points
-    tos[0, :, :].flatten(),          # Corresponding values
-    (lon_reg, lat_reg),              # Target grid
-    method='linear')                 # Interpolation method: 'linear', 'nearest', or 'cubic'
+# Remap data with a linear interpolation (same result as scipy.interpolate.griddata)
+# The triangulation and the weights are computed once and saved in the folder 'regrid_weights':
+# the next runs (and the other time steps) only need a fast matrix product
+tos_regridder = Regridder(lon, lat, lon_reg, lat_reg, cache_dir='regrid_weights')
+tos_remapped = tos_regridder(tos)  # Masked values (land) become NaN
 
 # Replace values greater than 10^5 with NaN
 tos_remapped = np.where(tos_remapped > 1e5, np.nan, tos_remapped)
 
 lon_orog, lat_orog = np.meshgrid(lon_orog, lat_orog)
-# Remap the orog variable with scipy.interpolate.griddata
-orog_remapped = griddata(
-    (lon_orog.flatten(), lat_orog.flatten()),  # Original points
-    orog.flatten(),                            # Corresponding values (in 1D)
-    (lon_reg, lat_reg),                        # Target grid
-    method='linear')                           # Interpolation method: 'linear', 'nearest', or 'cubic'
+# Remap the orog variable (linear interpolation, weights computed once and cached)
+orog_regridder = Regridder(lon_orog, lat_orog, lon_reg, lat_reg, cache_dir='regrid_weights')
+orog_remapped = orog_regridder(orog)
 
 orog_remapped = np.where(orog_remapped == 0, np.nan, orog_remapped)
 
@@ -83,14 +74,16 @@ levels = np.arange(vmin, vmax + 1, 1)  # Level range with a step of 1
 fig = plt.figure(figsize=(13.5, 6.25))
 ax = fig.add_subplot(1, 1, 1, projection=ccrs.Robinson(central_longitude=0))
 
+# The regular grid is projected once (cached per grid and projection, see climax_maps.py)
+# and all the layers below are drawn in map coordinates
+grid = projected_grid(lon_reg, lat_reg, ax.projection)
+
 # Plot the interpolated data (temperatures) with alpha for transparency
-im_tos = ax.contourf(lon_reg, lat_reg, tos_remapped, levels=levels, transform=ccrs.PlateCarree(), 
-                     cmap=cm.lipari, extend='both', alpha=1)
+im_tos = grid.contourf(ax, tos_remapped, levels=levels, cmap=cm.lipari, extend='both', alpha=1)
 
 # Add line for temperatures levels
 contour_levels = [15, 20, 25, 30, 35]
-contours = ax.contour(lon_reg, lat_reg, tos_remapped, levels=contour_levels, 
-                      colors='white', linewidths=0.8, transform=ccrs.PlateCarree())
+contours = grid.contour(ax, tos_remapped, levels=contour_levels, colors='white', linewidths=0.8)
 
 # Add label for temperatures level
 ax.clabel(contours, inline=True, fmt='%d°C', fontsize=8, colors='white')
@@ -105,13 +98,12 @@ levels_orog = [0, 5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 200, 300,
                1600, 1700, 1800, 1900, 2000, 2100, 2200, 2300, 2400]  # Level range for altitude
 
 # Plot the interpolated data (altitude)
-im_orog = ax.contourf(lon_reg, lat_reg, orog_remapped, levels=levels_orog, 
-                      transform=ccrs.PlateCarree(), cmap='terrain', extend='both', alpha=1)  # alpha = 0.6 => 60% transparency
+im_orog = grid.contourf(ax, orog_remapped, levels=levels_orog, 
+                        cmap='terrain', extend='both', alpha=1)  # alpha = 0.6 => 60% transparency
 
 # Add line for temperatures levels
 contour_levels2 = [1000, 1500, 2000, 2200, 2400]
-contours2 = ax.contour(lon_reg, lat_reg, orog_remapped, levels=contour_levels2, 
-                      colors='black', linewidths=0.8, transform=ccrs.PlateCarree())
+contours2 = grid.contour(ax, orog_remapped, levels=contour_levels2, colors='black', linewidths=0.8)
 
 # Add label for temperatures level
 ax.clabel(contours2, inline=True, fmt='%dm', fontsize=8, colors='black')
@@ -133,12 +125,13 @@ gl.ylabel_style = {'size': 10, 'color': 'black'}
 
 #plt.savefig('tos_orog_IPSLCM5A2_3X_steinigetal2024.png', dpi=300, bbox_inches='tight') # Save the map
 
+#%% Remap the whole tos time series (every month) to the regular grid
+# The time series is read by chunks of limited size, remapped with the same weights as above
+# and written to a new NetCDF file (used for climatologies and animations)
+remap_time_series = False  # Set to True to create the file
 
-
-
-
-
-
-
-
-
+if remap_time_series:
+    tos_regridder.remap_netcdf('tos_IPSLCM5A2_deepmip-eocene-p1-x3_v1.0.time_series.nc', 'tos',
+                               'tos_IPSLCM5A2_deepmip-eocene-p1-x3_v1.0.time_series.remapped.nc',
+                               lon=np.linspace(-180, 180, 360), lat=np.linspace(-90, 90, 180),
+                               time_name='time_counter', chunk_bytes=256 * 1024**2)
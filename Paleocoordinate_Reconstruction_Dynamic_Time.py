@@ -58,25 +58,25 @@ La description du code suivant a été générée par l'IA ChatGPT
 
 ### ======================== Libraries =========================== ###
 
-import pandas as pd
-import numpy as np
-import requests # communication avec l'API GPlates
-import time
 from tqdm import tqdm # affichage d'une barre de progression
+from paleo_reconstruction import reconstruct_file, GPlatesClient # regroupement par âge et requêtes par lots
+from paleo_cache import ReconstructionCache # cache des reconstructions déjà effectuées
+from plate_rotation import LocalReconstructor # moteur de reconstruction hors ligne
 
 
 ### ======================== Input File =========================== ###
 
-# Lecture du fichier txt
+# Fichier txt d'entrée et fichier de sortie (noms à adapter)
 # Adapter le séparateur (sep) si besoin
-data = pd.read_csv("Coord.txt", sep=r"\s+", engine="python")
+input_file  = "Coord.txt"
+output_file = "Coords_Reconstructed.txt"
+sep = r"\s+"
 
-
-### ======================== Output Containers =========================== ###
-
-# Listes qui stockeront les coordonnées paléogéographiques reconstruites
-pallat = []  # Latitudes paléo
-pallon = []  # Longitudes paléo
+# Le fichier est lu et traité par blocs de `chunksize` lignes : chaque bloc terminé
+# est ajouté au fichier de sortie et un point de reprise est enregistré
+# (Coords_Reconstructed.txt.checkpoint). Si le script s'arrête, il suffit de le
+# relancer pour reprendre après la dernière ligne terminée
+chunksize = 10000
 
 
 ### ======================== GPlates Parameters =========================== ###
@@ -84,63 +84,42 @@ pallon = []  # Longitudes paléo
 # Modele de reconstruction tectonique utilisé
 model = "MULLER2022"
 
+# Moteur de reconstruction : "web" (API GPlates) ou "local" (hors ligne, plate_rotation.py)
+# Le moteur local utilise un fichier de rotations (.rot) et les polygones des plaques
+# (GeoJSON avec la propriété PLATEID1), par exemple exportés depuis GPlates
+backend = "web"
+rotation_file = "MULLER2022_rotations.rot"
+polygons_file = "MULLER2022_static_polygons.geojson"
+engine = LocalReconstructor(rotation_file, polygons_file) if backend == "local" else None
+
 # URL de l'API GPlates pour la reconstruction de points
 url = "https://gws.gplates.org/reconstruct/reconstruct_points/"
 
-
-### ======================== Reconstruction Loop =========================== ###
-
-# Boucle sur chaque ligne du fichier d'entrée
-# tqdm permet de suivre l'avancement du traitement
-for idx, row in tqdm(data.iterrows(), total=len(data), desc="Reconstruction"):
-    try:
-        # Conversion des valeurs en float
-        # La méthode replace permet de gérer les virgules comme séparateur décimal
-        lat = float(str(row['ModLat']).replace(',', '.'))
-        lon = float(str(row['ModLon']).replace(',', '.'))
-        age = float(str(row['Age']).replace(',', '.'))
-
-        # Paramètres envoyés à l'API GPlates
-        # Attention : l'ordre est longitude, latitude
-        params = {"points": f"{lon},{lat}", "time": age, "model": model}
-
-        # Envoi de la requête HTTP à l'API
-        response = requests.get(url, params=params)
-
-        # Conversion de la réponse au format JSON
-        data_json = response.json()
-
-        # Vérification que des coordonnées reconstruites sont retournées
-        if "coordinates" in data_json and data_json["coordinates"]:
-            # Extraction des coordonnées paléo
-            plon, plat = data_json["coordinates"][0]
-            pallon.append(plon)
-            pallat.append(plat)
-        else:
-            # Cas où l'API ne retourne aucune reconstruction
-            print(f"Aucune coordonnée paléo pour ({lon}, {lat}) à {age} Ma")
-            pallon.append(np.nan)
-            pallat.append(np.nan)
-
-    except Exception as e:
-        # Gestion des erreurs (données invalides, problème API, etc.)
-        print(f"Erreur à la ligne {idx}: {e}")
-        pallon.append(np.nan)
-        pallat.append(np.nan)
-
-    # Pause pour éviter de surcharger l'API GPlates
-    time.sleep(0.1)
-
-
-### ======================== Export Results =========================== ###
-
-# Ajout des colonnes de coordonnées reconstruites au tableau original
-data['PalLat'] = pallat
-data['PalLon'] = pallon
-
-# Sauvegarde des résultats dans un nouveau fichier
-# Nom du fichier de sortie peut être adapté
-data.to_csv("Coords_Reconstructed.txt", index=False, sep="\t") 
-
-print("Reconstruction terminée : fichier Coords_Reconstructed.txt créé.")
+# Cache des reconstructions (fichier partagé avec Paleocoordinate_Reconstruction_Fixed_Age.py)
+# Les points déjà reconstruits lors d'une exécution précédente ne sont pas redemandés
+cache = ReconstructionCache("gplates_cache.sqlite", max_entries=1_000_000)
+
+# Client HTTP : connexions réutilisées, 4 requêtes simultanées au maximum, au plus
+# 10 requêtes par seconde (ralentit automatiquement si le serveur est surchargé)
+# et jusqu'à 4 nouvelles tentatives pour une requête en échec
+client = GPlatesClient(url, max_workers=4, rate=10, max_retries=4)
+
+
+### ======================== Reconstruction and Export =========================== ###
+
+# Les lignes qui partagent le même âge (et le même modèle, si le fichier contient
+# une colonne Model) sont regroupées : une série de requêtes par lots par groupe
+# au lieu d'une requête par ligne
+# Les virgules décimales (-12,5) sont converties en une seule passe sur chaque colonne
+# tqdm permet de suivre l'avancement du traitement (un pas par requête)
+# Le fichier de sortie contient les colonnes originales et les colonnes PalLat et PalLon
+reconstruct_file(input_file, output_file, chunksize=chunksize, sep=sep,
+                 lat_col='ModLat', lon_col='ModLon', age_col='Age',
+                 model=model, client=client, cache=cache, progress=tqdm, verbose=True,
+                 backend=backend, engine=engine)
+client.close()
+
+print(f"Reconstruction terminée : fichier {output_file} créé.")
+cache.report()
+cache.close()
 ### ====================================================================== ###
\ No newline at end of file
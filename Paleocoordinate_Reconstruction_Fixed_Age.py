@@ -64,8 +64,10 @@ La description du code suivant a été générée par l'IA ChatGPT
 ### ======================== Libraries =========================== ###
 
 import numpy as np
-import requests
 import time
+from paleo_reconstruction import reconstruct_points, GPlatesClient
+from paleo_cache import ReconstructionCache
+from plate_rotation import LocalReconstructor
 
 
 ### ======================== Input File =========================== ###
@@ -79,13 +81,6 @@ modlon = data[:, 0]   # Longitude moderne
 modlat = data[:, 1]   # Latitude moderne
 
 
-### ======================== Output Containers =========================== ###
-
-# Listes pour stocker les coordonnées paléogéographiques reconstruites
-pallon = []  # Longitude paléo
-pallat = []  # Latitude paléo
-
-
 ### ======================== GPlates Parameters =========================== ###
 
 # URL de l'API GPlates pour la reconstruction de points
@@ -97,6 +92,18 @@ age = 17
 # Modèle tectonique utilisé
 model = "MULLER2022"
 
+# Moteur de reconstruction : "web" (API GPlates) ou "local" (hors ligne, plate_rotation.py)
+# Le moteur local utilise un fichier de rotations (.rot) et les polygones des plaques
+# (GeoJSON avec la propriété PLATEID1), par exemple exportés depuis GPlates
+backend = "web"
+rotation_file = "MULLER2022_rotations.rot"
+polygons_file = "MULLER2022_static_polygons.geojson"
+engine = LocalReconstructor(rotation_file, polygons_file) if backend == "local" else None
+
+# Cache des reconstructions (fichier partagé avec Paleocoordinate_Reconstruction_Dynamic_Time.py)
+# Les points déjà reconstruits lors d'une exécution précédente ne sont pas redemandés
+cache = ReconstructionCache("gplates_cache.sqlite", max_entries=1_000_000)
+
 
 ### ======================== Timing =========================== ###
 
@@ -104,47 +111,23 @@ model = "MULLER2022"
 start_time = time.time()
 
 
-### ======================== Reconstruction Loop =========================== ###
-
-# Boucle sur chaque point moderne
-for lon, lat in zip(modlon, modlat):
-
-    # Paramètres envoyés à l'API GPlates
-    # Attention à l'ordre : longitude, latitude
-    params = {"points": f"{lon},{lat}", "time": age, "model": model}
-
-    # Envoi de la requête HTTP
-    response = requests.get(url, params=params)
-
-    try:
-        # Conversion de la réponse JSON
-        data_json = response.json()
-        print(f"Réponse pour ({lon}, {lat}) : {data_json}")
-
-        # Vérification de la présence de coordonnées reconstruites
-        if "coordinates" in data_json:
-            coords_list = data_json["coordinates"]
-
-            if isinstance(coords_list, list) and len(coords_list) > 0:
-                # Extraction des coordonnées paléo
-                plon, plat = coords_list[0]
-                pallon.append(plon)
-                pallat.append(plat)
-                continue  # On passe au point suivant
+### ======================== Reconstruction =========================== ###
 
-        # Cas où la reconstruction n'est pas valide
-        print(f"Données manquantes ou invalides pour ({lon}, {lat})")
-        pallon.append(np.nan)
-        pallat.append(np.nan)
+# Nombre maximal de points envoyés dans chaque requête à l'API GPlates
+# (les points sont regroupés par lots au lieu d'une requête par point)
+max_points = 500
 
-    except Exception as e:
-        # Gestion des erreurs
-        print(f"Erreur pour ({lon}, {lat}) : {e}")
-        pallon.append(np.nan)
-        pallat.append(np.nan)
+# Client HTTP : connexions réutilisées, 4 requêtes simultanées au maximum, au plus
+# 10 requêtes par seconde (ralentit automatiquement si le serveur est surchargé)
+# et jusqu'à 4 nouvelles tentatives pour une requête en échec
+client = GPlatesClient(url, max_workers=4, rate=10, max_retries=4)
 
-    # Pause pour éviter de surcharger le serveur GPlates
-    time.sleep(0.1)
+# Reconstruction de tous les points (paleo_reconstruction.py)
+# Les points que le modèle ne peut pas reconstruire reçoivent NaN
+pallon, pallat = reconstruct_points(modlon, modlat, age, model=model, client=client,
+                                    max_points=max_points, cache=cache, verbose=True,
+                                    backend=backend, engine=engine)
+client.close()
 
 
 ### ======================== Export Results =========================== ###
@@ -168,4 +151,6 @@ elapsed = end_time - start_time
 
 print("Reconstruction terminée : fichier Paleo_Location.txt créé.")
 print(f"Durée d'exécution : {elapsed:.2f} secondes.")
+cache.report()
+cache.close()
 ### ====================================================================== ###
\ No newline at end of file
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 21:04:17 2026
+
+@author: nthar
+Headless batch rendering of the CLIMAX figures.
+
+A job list (JSON file or list of dicts) describes the figures to produce;
+the jobs are rendered in parallel by a pool of processes on the Agg backend
+(no window) and saved to PNG files. The datasets are loaded once per worker
+process and reused by all the jobs of that worker.
+
+Each job is a dict with a "type", an "output" file and the parameters of
+its renderer (see RENDERERS), and optionally its own "dpi", e.g. in jobs.json:
+
+    [{"type": "climax_map", "output": "maps/CLIMAX_560ppm.png", "pCO2": 560},
+     {"type": "climax_map", "output": "maps/CLIMAX_840ppm.png", "pCO2": 840, "day": 180, "dpi": 150},
+     {"type": "time_series", "output": "d18O_d13C.png", "age_window": [17, 34]},
+     {"type": "phanerozoic", "output": "500Ma_GMST_CO2.png"},
+     {"type": "script", "output": "overlay.png", "path": "Overlay_2variables_from_NetCDF_file.py"}]
+
+Usage:
+    python batch_render.py jobs.json --workers 8 --dpi 300
+"""
+
+import matplotlib
+matplotlib.use('Agg')  # Before pyplot: no window, no interactive backend
+
+import os
+import json
+import time
+import runpy
+import argparse
+import traceback
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.patches as mpatches
+
+from climax_model import build_temperature_field, calculate_forcing
+from climax_model import ZoneTable, DEFAULT_ZONE_TABLE, DEFAULT_ZONE_RECTANGLES
+from climax_model import paint_zone_map, load_zone_map, load_zone_rectangles
+from climax_datasets import load_westerhold, load_excel
+from climax_timeseries import AgeSeries
+from climax_plotting import plot_decimated, fill_between_decimated, load_timescale
+from climax_plotting import TimescaleOverlay, PHANEROZOIC_PERIODS, ICE_PERIODS, OLIGOCENE_MIOCENE
+
+
+#%% Datasets (loaded once per worker process)
+
+@lru_cache(maxsize=None)
+def _climax_world(zone_map_file=None, zone_rectangles_file=None, zone_table_file=None):
+    """Temperature field of CLIMAX_v1.py (50 x 50 cells, 10 depths, 365 days) with the zone offsets."""
+    nlon, nlat, ndepth, ntime = 50, 50, 10, 365
+    lat_center = nlat // 2
+    lat_effect = np.concatenate([np.linspace(-20, 20, lat_center), np.linspace(20, -20, nlat - lat_center)])
+    depth_effect = np.linspace(5, 0, ndepth)
+    seasonvar = 10 * np.sin(2 * np.pi * np.arange(ntime) / ntime)
+    temperature = build_temperature_field(lat_effect, depth_effect, seasonvar, nlat, base=15)
+
+    if zone_map_file is not None:
+        geo_map = load_zone_map(zone_map_file, (nlon, nlat))
+    elif zone_rectangles_file is not None:
+        geo_map = paint_zone_map((nlon, nlat), load_zone_rectangles(zone_rectangles_file))
+    else:
+        geo_map = paint_zone_map((nlon, nlat), DEFAULT_ZONE_RECTANGLES)
+    zone_table = ZoneTable.from_file(zone_table_file) if zone_table_file else ZoneTable(DEFAULT_ZONE_TABLE)
+    temperature = temperature.add_term(('lon', 'lat'), zone_table.apply(np.zeros(geo_map.shape), geo_map))
+    return temperature, geo_map
+
+
+@lru_cache(maxsize=None)
+def _westerhold(path):
+    time_w, d13C, d18O = load_westerhold(path)
+    return AgeSeries(time_w, d18O=d18O, d13C=d13C)
+
+
+@lru_cache(maxsize=None)
+def _hansen(path):
+    data = load_excel(path, columns=['Time_H', 'delta_18O_H'])
+    return AgeSeries(data['Time_H'], d18O=data['delta_18O_H'])
+
+
+@lru_cache(maxsize=None)
+def _phanda(path):
+    columns = ['AverageAge'] + [f'{var}_{p}' for var in ('GMST', 'CO2') for p in ('05', '16', '50', '84', '95')]
+    return load_excel(path, columns=columns)
+
+
+@lru_cache(maxsize=None)
+def _timescale(name):
+    """Timescale overlay from a table of climax_plotting.py or a text file (load_timescale)."""
+    tables = {'phanerozoic': PHANEROZOIC_PERIODS, 'ice': ICE_PERIODS, 'oligocene_miocene': OLIGOCENE_MIOCENE}
+    return TimescaleOverlay(tables[name] if name in tables else load_timescale(name))
+
+
+#%% Renderers
+
+def render_climax_map(pCO2=560, depth=5, day=12, zone_map_file=None, zone_rectangles_file=None,
+                      zone_table_file=None, dpi=300):
+    """CLIMAX temperature map with zone and temperature contours (as in CLIMAX_v1.py)."""
+    temperature, geo_map = _climax_world(zone_map_file, zone_rectangles_file, zone_table_file)
+    values = temperature.with_forcing(calculate_forcing(pCO2))[:, :, depth, day]
+
+    # Figure created at the export resolution, so the contour labels are placed as they are saved
+    fig, ax = plt.subplots(figsize=(13.5, 6.25), dpi=dpi)
+    image = ax.imshow(values, cmap='coolwarm', vmin=-20, vmax=40)
+    fig.colorbar(image, ax=ax, label="Temperature (°C)")
+    ax.set_title(f"Simulation at {pCO2} ppm CO2 (depth {depth}, day {day})")
+    ax.set_xlabel("Longitude")
+    ax.set_ylabel("Latitude")
+
+    zone_labels = ["Ocean", "Forest", "Desert", "Continent", "Polar ice cap"]
+    zone_colors = ['blue', 'green', 'yellow', 'black', 'white']
+    for zone_value, color in zip(np.unique(geo_map), zone_colors):
+        ax.contour(geo_map == zone_value, levels=[0.5], colors=color, linewidths=1.5, alpha=0.9)
+    contour_plot = ax.contour(values, levels=[-20, -10, 0, 10, 20, 30, 40], colors='white', linewidths=1)
+    ax.clabel(contour_plot, inline=True, fontsize=8, fmt="%1.0f°C")
+    patches = [mpatches.Patch(color=color, label=label) for color, label in zip(zone_colors, zone_labels)]
+    ax.legend(handles=patches, loc='lower left', title="Geographical zones")
+    return fig
+
+
+def render_time_series(westerhold='Table_Westerhold.txt', hansen='Table_Hansen.xlsx', age_window=(17, 34),
+                       window=100, timescale='oligocene_miocene', ylim=(-1, 3.5), dpi=300):
+    """δ18O and δ13C records over an age window (as in Custom_chart_for_time_series.py)."""
+    w = _westerhold(westerhold).rolling(*age_window, windows=window)
+    h = _hansen(hansen).rolling(*age_window, windows=window)
+
+    fig, ax = plt.subplots(figsize=(13.5, 6.25))
+    plot_decimated(ax, w.age, w['d18O'], c='b', linewidth=0.75, alpha=0.25, dpi=dpi)
+    plot_decimated(ax, w.age, w['d13C'], c='r', linewidth=0.75, alpha=0.25, dpi=dpi)
+    plot_decimated(ax, w.age, w[f'd18O_mean_{window}'], c='b', linewidth=1.25, label='δ18O [Westerhold et al., 2020]', dpi=dpi)
+    plot_decimated(ax, w.age, w[f'd13C_mean_{window}'], c='r', linewidth=1.25, label='δ13C [Westerhold et al., 2020]', dpi=dpi)
+    plot_decimated(ax, h.age, h['d18O'], c='green', alpha=0.25, linewidth=0.75, dpi=dpi)
+    plot_decimated(ax, h.age, h[f'd18O_mean_{window}'], c='green', linestyle='--', linewidth=1.25, label="δ18O [Hansen et al., 2013]", dpi=dpi)
+    ax.invert_xaxis()
+    if timescale:
+        _timescale(timescale).draw(ax, zorder=1, fontsize=15)
+
+    ax.set_xlabel("Time (My)", fontsize=15)
+    ax.set_ylabel("δ18O and δ13C (‰ PDB)", fontsize=15)
+    ax.set_ylim(*ylim)
+    ax.set_title("Evolution of δ18O and δ13C (benthic foraminifera) over time", fontsize=15)
+    ax.grid(color='gray', linewidth=0.5)
+    ax.legend(loc="upper left", prop={'size': 9})
+    return fig
+
+
+def render_phanerozoic(path="PhanDA_GMSTandCO2_percentiles.xlsx", dpi=300):
+    """CO2 and GMST percentiles over the Phanerozoic (as in 500Ma_GMST_CO2.py)."""
+    data = _phanda(path)
+    age = data['AverageAge']
+
+    fig, (ax2, ax1) = plt.subplots(2, 1, figsize=(25.25, 13.75))
+    for ax, var, color, label in ((ax2, 'CO2', 'black', "CO2 Concentration (ppm)"),
+                                  (ax1, 'GMST', 'red', "Global Mean Surface Temperature (°C)")):
+        plot_decimated(ax, age, data[f'{var}_50'], color=color, linewidth=3, label='50', dpi=dpi)
+        fill_between_decimated(ax, age, data[f'{var}_16'], data[f'{var}_84'], color=color, alpha=0.35, label='16 - 84', dpi=dpi)
+        fill_between_decimated(ax, age, data[f'{var}_05'], data[f'{var}_95'], color=color, alpha=0.25, label='05 - 95', dpi=dpi)
+        ax.set_ylabel(label, fontsize=25)
+        ax.set_xticks(np.arange(0, 550, 50))
+        ax.tick_params(labelsize=25)
+        ax.invert_xaxis()
+        ax.grid(True, linestyle='--', color='gray', alpha=0.5, zorder=1)
+        legend = ax.legend(loc='upper right', prop={'size': 18, 'style': 'italic'},
+                           title=f"Percentiles {var}", title_fontsize=18)
+        legend.get_title().set_fontweight('bold')
+        _timescale('ice').draw(ax, zorder=3)
+        _timescale('phanerozoic').draw(ax, zorder=2, fontsize=19, fontweight='bold')
+    ax2.set_ylim(-850, 5000)
+    ax1.set_yticks(np.arange(0, 46, 5))
+    ax1.set_xlabel("Age (Ma)", fontsize=25)
+    fig.suptitle("Variations in CO2 and Global Mean Surface Temperatures Over the Last 485 Million Years", fontsize=28)
+    fig.tight_layout()
+    return fig
+
+
+def render_script(path, dpi=300):
+    """
+    Run one of the scripts and return all the figures it creates.
+
+    The script runs under another name than '__main__', so its
+    `if __name__ == '__main__':` block (e.g. the animation of 3D_Earth.py,
+    with its own ffmpeg process and process pool) is not run by the batch.
+    """
+    plt.close('all')
+    runpy.run_path(path, run_name='__batch_render__')
+    return [plt.figure(number) for number in plt.get_fignums()]
+
+
+RENDERERS = {
+    'climax_map':  render_climax_map,
+    'time_series': render_time_series,
+    'phanerozoic': render_phanerozoic,
+    'script':      render_script}
+
+
+#%% Batch
+
+def _init_worker(font_family):
+    matplotlib.use('Agg')
+    plt.rcParams["font.family"] = font_family
+
+
+def render_job(job, dpi=300):
+    """
+    Render one job and save its figure(s).
+
+    A "dpi" in the job overrides the dpi of the batch.
+
+    Returns:
+        result (dict): The output file(s), the rendering time (s) and the error, if any.
+    """
+    start = time.perf_counter()
+    dpi = job.get('dpi', dpi)
+    params = {key: value for key, value in job.items() if key not in ('type', 'output', 'dpi')}
+    result = {'output': job.get('output'), 'files': [], 'error': None}
+    try:
+        figures = RENDERERS[job['type']](dpi=dpi, **params)
+        figures = figures if isinstance(figures, list) else [figures]
+        root, ext = os.path.splitext(job['output'])
+        os.makedirs(os.path.dirname(job['output']) or '.', exist_ok=True)
+        for i, fig in enumerate(figures):
+            # A script creating several figures gives output_1.png, output_2.png, ...
+            path = job['output'] if len(figures) == 1 else f"{root}_{i + 1}{ext}"
+            fig.savefig(path, dpi=dpi, bbox_inches='tight')
+            plt.close(fig)
+            result['files'].append(path)
+    except Exception:
+        result['error'] = traceback.format_exc()
+        plt.close('all')
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def render_batch(jobs, workers=None, dpi=300, font_family="Times New Roman", verbose=True):
+    """
+    Render a list of jobs in parallel (one process per core by default).
+
+    Parameters:
+        jobs (list or str): Jobs (dicts) or a JSON file containing them.
+        workers (int): Number of processes (None = number of cores, 1 = no pool).
+        dpi (int): Resolution of the PNG files.
+        font_family (str): Font of the figures.
+        verbose (bool): Print the timing of each job.
+
+    Returns:
+        results (list): One dict per job, in the order of the job list.
+    """
+    if isinstance(jobs, str):
+        with open(jobs, 'r') as file:
+            jobs = json.load(file)
+    for job in jobs:
+        if job.get('type') not in RENDERERS:
+            raise ValueError(f"unknown job type {job.get('type')!r} (expected one of {list(RENDERERS)})")
+
+    start = time.perf_counter()
+    results = [None] * len(jobs)
+
+    def report(i, result):
+        results[i] = result
+        if verbose:
+            done = sum(r is not None for r in results)
+            status = "FAILED" if result['error'] else f"{result['seconds']:.2f} s"
+            print(f"[{done}/{len(jobs)}] {result['output']}: {status}")
+            if result['error']:
+                print(result['error'])
+
+    if workers == 1:
+        _init_worker(font_family)
+        for i, job in enumerate(jobs):
+            report(i, render_job(job, dpi))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(font_family,)) as pool:
+            futures = {pool.submit(render_job, job, dpi): i for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                report(futures[future], future.result())
+
+    if verbose:
+        failed = sum(r['error'] is not None for r in results)
+        busy = sum(r['seconds'] for r in results)
+        print(f"{len(jobs) - failed} figures rendered, {failed} failed, in {time.perf_counter() - start:.1f} s "
+              f"({busy:.1f} s of rendering)")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render CLIMAX figures in batch (Agg backend, process pool).")
+    parser.add_argument('jobs', help="JSON file with the list of jobs")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes (default: number of cores)")
+    parser.add_argument('--dpi', type=int, default=300, help="resolution of the PNG files")
+    args = parser.parse_args()
+    render_batch(args.jobs, workers=args.workers, dpi=args.dpi)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 19:02:41 2026
+
+@author: nthar
+Loaders of the data tables used by the time-series scripts.
+
+Each table is parsed once and saved next to the source file as a binary
+.npz sidecar (e.g. Table_Westerhold.txt.npz, Table_Hansen.xlsx.npz): the
+next runs reload the arrays directly, as long as the source file has not
+changed.
+"""
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+#%% Binary sidecars
+
+def _save_sidecar(path, arrays):
+    """Write the arrays to an .npz file (temporary file then rename, never half-written)."""
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def _file_signature(path):
+    """Modification time and size of a file (a change of either invalidates its sidecar)."""
+    stat = os.stat(path)
+    return np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+
+def _file_hash(path):
+    """SHA-1 of the content of a file."""
+    sha = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024**2), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+#%% Westerhold et al., 2020 (tab-separated text table)
+
+def _first_data_row(path, columns, sep='\t'):
+    """
+    Number of lines (comments, column names) before the first row of numbers,
+    and number of fields of that row.
+    """
+    with open(path, 'r') as file:
+        for n, line in enumerate(file):
+            fields = line.split(sep)
+            try:
+                [float(fields[c]) for c in columns]
+                return n, len(fields)
+            except (IndexError, ValueError):
+                pass
+    return 0, 0
+
+
+def load_westerhold(path='Table_Westerhold.txt', columns=(0, 3, 6), cache=True):
+    """
+    Load the time, δ13C and δ18O columns of the Westerhold et al. (2020) table.
+
+    The file is parsed in a single pass by pandas: lines starting with '#' are
+    comments, and rows that are too short or hold non-numeric values in the
+    requested columns (headers, gaps) are dropped, like the former line-by-line
+    reading. The arrays are cached in `path + '.npz'`, which is rebuilt when
+    the modification time or size of the text file changes.
+
+    Parameters:
+        path (str): Tab-separated text file.
+        columns (tuple): Indices of the time, δ13C and δ18O columns.
+        cache (bool): Use (and create) the .npz sidecar.
+
+    Returns:
+        time, d13C, d18O (ndarray): float64 arrays of the same length.
+    """
+    columns = list(columns)
+    signature = _file_signature(path)
+    sidecar = path + '.npz'
+    if cache and os.path.exists(sidecar):
+        with np.load(sidecar) as f:
+            if np.array_equal(f['signature'], signature) and np.array_equal(f['columns'], columns):
+                return tuple(f['values'])
+
+    # The header lines are skipped so that clean columns are parsed directly as floats;
+    # `names` gives every row the same width, so short rows are padded with NaN
+    # instead of breaking the parse, and longer rows keep their first fields
+    skip, width = _first_data_row(path, columns)
+    table = pd.read_csv(path, sep='\t', comment='#', header=None, names=range(max(width, max(columns) + 1)),
+                        usecols=columns, skiprows=skip, on_bad_lines='skip', low_memory=False)
+    # Columns with malformed values (text, gaps) are converted with NaN for those rows
+    values = np.column_stack([pd.to_numeric(table[c], errors='coerce').to_numpy(dtype=np.float64)
+                              for c in columns])
+    values = values[~np.isnan(values).any(axis=1)].T.copy()
+
+    if cache:
+        _save_sidecar(sidecar, {'signature': signature, 'columns': np.array(columns), 'values': values})
+    return tuple(values)
+
+
+#%% Excel tables (Hansen et al., 2013; Judd et al., 2024)
+
+def _columns_to_arrays(table):
+    """
+    One array per column; text columns are stored as strings plus a mask of the empty cells.
+    Object columns whose cells are all numbers (e.g. mixed int and float cells) are stored as floats.
+    """
+    arrays = {'columns': np.array(table.columns, dtype=str)}
+    for name in table.columns:
+        column = table[name]
+        if column.dtype.kind not in 'biufcmM':  # Not a number or a date
+            numeric = pd.to_numeric(column, errors='coerce')
+            if numeric.notna().sum() == column.notna().sum():
+                arrays[f'data:{name}'] = numeric.to_numpy(dtype=np.float64)
+                continue
+            arrays[f'text:{name}'] = column.fillna('').astype(str).to_numpy(dtype=str)
+            arrays[f'mask:{name}'] = column.isna().to_numpy()
+        else:
+            arrays[f'data:{name}'] = column.to_numpy()
+    return arrays
+
+
+def _arrays_to_columns(arrays, columns):
+    """DataFrame of the requested columns, reading only their arrays from the .npz file."""
+    data = {}
+    for name in columns:
+        if f'data:{name}' in arrays:
+            data[name] = arrays[f'data:{name}']
+        elif f'text:{name}' in arrays:
+            text = arrays[f'text:{name}'].astype(object)
+            text[arrays[f'mask:{name}']] = np.nan
+            data[name] = text
+        else:
+            raise KeyError(f"column {name!r} not found (available: {arrays['columns'].tolist()})")
+    return pd.DataFrame(data)
+
+
+def load_excel(path, columns=None, sheet_name=0, cache=True):
+    """
+    Load columns of an Excel sheet, through a binary cache.
+
+    The first call parses the whole sheet with pd.read_excel and saves every
+    column to `path + '.npz'`; the next calls only read the requested columns
+    from that file, as long as the SHA-1 of the Excel file is unchanged. The
+    columns are returned as stored in the cache on every call (numbers as
+    numbers, text as str), so the result does not depend on the cache state.
+
+    Parameters:
+        path (str): Excel file (e.g. "PhanDA_GMSTandCO2_percentiles.xlsx").
+        columns (list): Names of the columns to load (None = all).
+        sheet_name (int or str): Sheet to read.
+        cache (bool): Use (and create) the .npz sidecar.
+
+    Returns:
+        data (DataFrame): The requested columns, in the requested order.
+    """
+    sidecar = path + '.npz' if sheet_name == 0 else f'{path}.{sheet_name}.npz'
+    source = _file_hash(path)
+    if cache and os.path.exists(sidecar):
+        with np.load(sidecar) as f:
+            if str(f['source']) == source:
+                return _arrays_to_columns(f, f['columns'].tolist() if columns is None else columns)
+
+    table = pd.read_excel(path, sheet_name=sheet_name)
+    table.columns = table.columns.astype(str)
+    arrays = _columns_to_arrays(table)
+    if cache:
+        _save_sidecar(sidecar, {'source': np.array(source), **arrays})
+    return _arrays_to_columns(arrays, arrays['columns'].tolist() if columns is None else columns)
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 14:05:12 2026
+
+@author: nthar
+Tools shared by the map scripts (NetCDF grids on lat/lon).
+"""
+
+import os
+import hashlib
+import numpy as np
+from scipy.spatial import Delaunay
+from scipy import sparse
+from netCDF4 import Dataset
+
+
+#%% Grid preparation
+
+KELVIN = 273.15
+
+
+def prepare_grid(data, lon, cyclic=True, kelvin=False, mask_below=None, out=None, inplace=False,
+                 dtype=np.float32):
+    """
+    Prepare a (..., lat, lon) field for mapping in a single float buffer.
+
+    The steps run in place in one buffer, so the data is copied at most once
+    (instead of one new array per np.insert, np.concatenate, tas - 273.15 and
+    np.where):
+        1. copy of the data into the buffer, masked values -> NaN,
+        2. conversion Kelvin -> °C,
+        3. cyclic point: one more longitude lon[0] + 360 whose values are the
+           mean of the last and first columns (no white line at the seam, for
+           any number of longitudes),
+        4. values < mask_below -> NaN (e.g. sea level of the orography).
+
+    Parameters:
+        data (ndarray or MaskedArray): Field of shape (..., lat, lon).
+        lon (array-like): 1-D longitudes of the last axis.
+        cyclic (bool): Add the cyclic point.
+        kelvin (bool): Convert Kelvin to °C.
+        mask_below (float): Values below this threshold become NaN (None = no masking).
+        out (ndarray): Buffer to fill, of shape (..., lat, lon + 1) with the
+            cyclic point (..., lat, lon) without, e.g. to reuse the same buffer
+            for every map of a batch.
+        inplace (bool): Work in data itself when possible (no cyclic point,
+            unmasked array of the given dtype): no copy at all.
+        dtype: Float type of the buffer.
+
+    Returns:
+        grid (ndarray): The prepared field (the buffer).
+        lon (ndarray): The longitudes of the grid (1-D, with lon[0] + 360 if cyclic).
+            Use them with the 1-D latitudes in contour/contourf, no meshgrid is needed.
+    """
+    lon = np.ma.filled(np.ma.asarray(lon, dtype=np.float64), np.nan)
+    mask = np.ma.getmask(data)
+    values = np.ma.getdata(data)
+    nlon = values.shape[-1]
+    if len(lon) != nlon:
+        raise ValueError(f"lon has {len(lon)} values, the last axis of data has {nlon}")
+    shape = values.shape[:-1] + (nlon + 1 if cyclic else nlon,)
+
+    if out is None and inplace and not cyclic and mask is np.ma.nomask \
+            and isinstance(values, np.ndarray) and values.dtype == dtype:
+        out = values
+    elif out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape:
+        raise ValueError(f"out has shape {out.shape}, expected {shape}")
+
+    # 1. Copy and masked values -> NaN
+    grid = out[..., :nlon]
+    if out is not values:
+        np.copyto(grid, values, casting='unsafe')
+    if mask is not np.ma.nomask:
+        np.copyto(grid, np.nan, where=mask)
+
+    # 2. Kelvin -> °C
+    if kelvin:
+        grid -= KELVIN
+
+    # 3. Cyclic point
+    if cyclic:
+        np.add(out[..., nlon - 1], out[..., 0], out=out[..., nlon])
+        out[..., nlon] *= 0.5
+        lon = np.append(lon, lon[0] + 360)
+
+    # 4. Threshold
+    if mask_below is not None:
+        np.copyto(out, np.nan, where=out < mask_below)
+    return out, lon
+
+
+#%% Paleogeography boundaries
+
+# Neighbours checked around each cell: (row offset, column offset)
+NEIGHBOURS = {
+    4: [(-1, 0), (1, 0), (0, -1), (0, 1)],
+    8: [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]}
+
+
+def _pad_lat_lon(mask, periodic, cyclic_point):
+    """Pad the last two axes (lat, lon) of a boolean mask by one cell on each side."""
+    ndim = mask.ndim
+    # Latitude: nothing beyond the poles (padding with False = no water)
+    mask = np.pad(mask, [(0, 0)] * (ndim - 2) + [(1, 1), (0, 0)], mode='constant', constant_values=False)
+    # Longitude: the left neighbour of the first column is the last column (and vice versa)
+    if periodic and cyclic_point:
+        # The last column closes the seam (e.g. lon = 0 ... 360): skip it when wrapping
+        left, right = mask[..., -2:-1], mask[..., 1:2]
+    elif periodic:
+        left, right = mask[..., -1:], mask[..., :1]
+    else:
+        left = right = np.zeros_like(mask[..., :1])
+    return np.concatenate([left, mask, right], axis=-1)
+
+
+def create_paleogeography_boundaries(orog, connectivity=8, periodic=True, cyclic_point=False, threshold=0):
+    """
+    Create a paleogeography matrix from the orography data.
+    Identifies land areas (where orog > threshold) and marks the edges with specific values.
+
+    All the cells are processed at once with shifted copies of the land mask
+    (no loop over the cells), the longitude axis wraps around the 0/360° seam
+    and the first and last rows/columns are processed like the others.
+
+    Parameters:
+        orog (ndarray or list): Orography (altitude) of shape (..., lat, lon):
+            a 2-D map, a stack of maps (e.g. time slices), or a list of
+            arrays (e.g. several orography files, possibly of different sizes).
+        connectivity (int): 8 (default) checks the diagonal neighbours too, 4 only
+            the vertical and horizontal ones.
+        periodic (bool): Wrap the longitude axis (global grids).
+        cyclic_point (bool): The last longitude is an added column that closes
+            the seam (e.g. lon[0] + 360 from prepare_grid); it is skipped when wrapping.
+        threshold (float): Cells with orog > threshold are land. NaN cells are water.
+
+    Returns:
+        Y (ndarray or list): Integer array of the same shape as orog with:
+            - Internal land marked with 5,
+            - Borders of land regions marked with 2,
+            - Water marked with 0.
+    """
+    if isinstance(orog, (list, tuple)):
+        return [create_paleogeography_boundaries(o, connectivity, periodic, cyclic_point, threshold) for o in orog]
+    if connectivity not in NEIGHBOURS:
+        raise ValueError(f"connectivity must be 4 or 8, got {connectivity}")
+
+    # Step 1: Create binary mask for land (True) and water (False)
+    land = np.ma.filled(np.ma.asarray(orog) > threshold, False)
+    if land.ndim < 2:
+        raise ValueError(f"orog must have at least 2 dimensions (lat, lon), got {land.ndim}")
+
+    # Step 2: Water in at least one neighbour (shifted views of the padded mask)
+    water = _pad_lat_lon(~land, periodic, cyclic_point)
+    nlat, nlon = land.shape[-2:]
+    near_water = np.zeros_like(land)
+    for di, dj in NEIGHBOURS[connectivity]:
+        near_water |= water[..., 1 + di:1 + di + nlat, 1 + dj:1 + dj + nlon]
+
+    # Step 3: Borders (2) have priority over internal land (5)
+    Y = np.zeros(land.shape, dtype=int)
+    Y[land] = 5
+    Y[land & near_water] = 2
+    return Y
+
+
+#%% Regridding with cached interpolation weights
+
+def grid_hash(*arrays):
+    """Hash of the shapes and values of coordinate arrays (key of the weight cache)."""
+    sha = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(np.ma.filled(np.ma.asarray(array, dtype=np.float64), np.nan))
+        sha.update(str(array.shape).encode())
+        sha.update(array.tobytes())
+    return sha.hexdigest()
+
+
+class Regridder:
+    """
+    Linear remapping from a curvilinear (or scattered) grid to a target grid.
+
+    Gives the same result as scipy.interpolate.griddata(..., method='linear'),
+    but the Delaunay triangulation of the source points and the barycentric
+    weights of the target points are computed only once. They are stored as
+    a sparse matrix W (target points x source points), so remapping a field
+    is a matrix product W @ values, and they are saved to disk, keyed by a
+    hash of the source and target grids, to be reused by the next runs.
+
+    Parameters:
+        src_lon, src_lat (ndarray): Coordinates of the source points (any shape,
+            e.g. the 2-D nav_lon/nav_lat of IPSL or a meshgrid of lon/lat).
+        dst_lon, dst_lat (ndarray): Coordinates of the target points (any shape).
+        cache_dir (str): Folder of the saved weights. None = no disk cache.
+
+    Example:
+        regridder = Regridder(lon, lat, lon_reg, lat_reg)
+        tos_remapped = regridder(tos[0, :, :])
+    """
+
+    def __init__(self, src_lon, src_lat, dst_lon, dst_lat, cache_dir='regrid_weights'):
+        self.src_shape = np.shape(src_lon)
+        self.dst_shape = np.shape(dst_lon)
+        if np.shape(src_lat) != self.src_shape or np.shape(dst_lat) != self.dst_shape:
+            raise ValueError("longitudes and latitudes must have the same shape")
+        self.key = grid_hash(src_lon, src_lat, dst_lon, dst_lat)
+        self.cache_file = None if cache_dir is None else os.path.join(cache_dir, f"regrid_linear_{self.key}.npz")
+
+        if self.cache_file is not None and os.path.exists(self.cache_file):
+            self.weights, self.outside = self._load(self.cache_file)
+        else:
+            self.weights, self.outside = self._compute(src_lon, src_lat, dst_lon, dst_lat)
+            if self.cache_file is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                self._save(self.cache_file)
+
+    @staticmethod
+    def _compute(src_lon, src_lat, dst_lon, dst_lat):
+        """Triangulate the source points and compute the barycentric weights of the targets."""
+        # netCDF4 coordinates are MaskedArrays (rejected by Delaunay): masked -> NaN
+        def filled(x):
+            return np.ravel(np.ma.filled(np.ma.asarray(x, dtype=np.float64), np.nan))
+        points = np.column_stack([filled(src_lon), filled(src_lat)])
+        targets = np.column_stack([filled(dst_lon), filled(dst_lat)])
+        n_points = len(points)
+
+        # Missing source points are left out of the triangulation
+        valid = np.flatnonzero(np.isfinite(points).all(axis=1))
+        tri = Delaunay(points[valid])
+        simplex = tri.find_simplex(np.where(np.isfinite(targets), targets, 0))
+        simplex[~np.isfinite(targets).all(axis=1)] = -1
+        outside = simplex < 0                                  # Targets outside the convex hull
+
+        # Barycentric coordinates of each target in its triangle
+        inside = np.flatnonzero(~outside)
+        transform = tri.transform[simplex[inside]]
+        b = np.einsum('nij,nj->ni', transform[:, :2], targets[inside] - transform[:, 2])
+        weights = np.column_stack([b, 1 - b.sum(axis=1)])
+
+        rows = np.repeat(inside, 3)
+        cols = valid[tri.simplices[simplex[inside]]].ravel()
+        W = sparse.csr_matrix((weights.ravel(), (rows, cols)), shape=(len(targets), n_points))
+        return W, outside
+
+    def _save(self, path):
+        tmp = path + '.tmp.npz'
+        W = self.weights
+        np.savez(tmp, data=W.data, indices=W.indices, indptr=W.indptr, shape=W.shape, outside=self.outside)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _load(path):
+        with np.load(path) as f:
+            W = sparse.csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape']))
+            return W, f['outside']
+
+    def __call__(self, values, dtype=np.float64):
+        """
+        Remap values defined on the source grid.
+
+        Parameters:
+            values (ndarray): Array of shape (..., *src_shape). Masked values
+                are replaced by NaN. Leading axes (e.g. time) are remapped
+                together in a single sparse product.
+            dtype (dtype): Type of the result.
+
+        Returns:
+            remapped (ndarray): Array of shape (..., *dst_shape), NaN outside
+                the source grid and next to missing values.
+        """
+        values = np.ma.filled(np.ma.asarray(values, dtype=dtype), np.nan)
+        ndim_src = len(self.src_shape)
+        if values.shape[values.ndim - ndim_src:] != self.src_shape:
+            raise ValueError(f"values must end with the source shape {self.src_shape}, got {values.shape}")
+        lead = values.shape[:values.ndim - ndim_src]
+
+        # (points x batch) product: all the leading slices share the same weights
+        columns = values.reshape(-1, self.weights.shape[1]).T
+        remapped = (self.weights @ columns).astype(dtype, copy=False)
+        remapped[self.outside] = np.nan
+        return remapped.T.reshape(lead + self.dst_shape)
+
+    def remap_netcdf(self, src_path, varname, dst_path, lon, lat, time_name='time_counter',
+                     chunk_bytes=256 * 1024**2, complevel=4, dtype=np.float32):
+        """
+        Remap every time step of a NetCDF variable and write them to a new NetCDF file.
+
+        The time axis is read in chunks of a bounded size; each chunk is remapped
+        with a single (target points x source points) @ (source points x time)
+        product and appended to the output file, so memory stays bounded
+        whatever the length of the time series.
+
+        Parameters:
+            src_path (str): Input NetCDF file (e.g. the tos time series).
+            varname (str): Variable of shape (time, *src_shape), e.g. 'tos'.
+            dst_path (str): Output NetCDF file.
+            lon, lat (ndarray): 1-D longitudes and latitudes of the target grid
+                (the regridder target being their meshgrid, shape (lat, lon)).
+            time_name (str): Name of the time variable of the input file.
+            chunk_bytes (int): Maximum memory used by one chunk (input + output).
+            complevel (int): zlib compression level of the output (1-9).
+            dtype (dtype): Type of the output variable.
+
+        Returns:
+            dst_path (str): The output NetCDF file.
+        """
+        lon, lat = np.asarray(lon), np.asarray(lat)
+        if self.dst_shape != (len(lat), len(lon)):
+            raise ValueError(f"target grid has shape {self.dst_shape}, not (len(lat), len(lon)) = {(len(lat), len(lon))}")
+
+        with Dataset(src_path, 'r') as src, Dataset(dst_path, 'w') as dst:
+            var = src.variables[varname]
+            ntime = var.shape[0]
+            step_bytes = 8 * (int(np.prod(self.src_shape)) + int(np.prod(self.dst_shape)))
+            nchunk = max(1, min(ntime, chunk_bytes // step_bytes))
+
+            # Output file: time (unlimited), lat, lon
+            dst.createDimension('time', None)
+            dst.createDimension('lat', len(lat))
+            dst.createDimension('lon', len(lon))
+            time_out = dst.createVariable('time', 'f8', ('time',))
+            if time_name in src.variables:
+                time_in = src.variables[time_name]
+                time_out.setncatts({k: time_in.getncattr(k) for k in time_in.ncattrs() if k != '_FillValue'})
+            for name, values, units in (('lat', lat, 'degrees_north'), ('lon', lon, 'degrees_east')):
+                coord = dst.createVariable(name, 'f8', (name,))
+                coord[:] = values
+                coord.units = units
+            out = dst.createVariable(varname, dtype, ('time', 'lat', 'lon'), zlib=True, complevel=complevel,
+                                     chunksizes=(1, len(lat), len(lon)), fill_value=np.nan)
+            out.setncatts({k: var.getncattr(k) for k in var.ncattrs() if k not in ('_FillValue', 'missing_value')})
+
+            # Remap the time series chunk by chunk
+            for t0 in range(0, ntime, nchunk):
+                t1 = min(t0 + nchunk, ntime)
+                out[t0:t1] = self(var[t0:t1], dtype=dtype)
+                if time_name in src.variables:
+                    time_out[t0:t1] = src.variables[time_name][t0:t1]
+        return dst_path
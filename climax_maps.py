@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 23:12:47 2026
+
+@author: nthar
+Map layers drawn in the projected coordinates of the map, shared by the map scripts.
+
+With transform=ccrs.PlateCarree(), Cartopy projects the coordinates again
+for every contour/contourf layer (and for every map of a batch). Here the
+grid is projected once per (grid, projection) and cached, and every layer
+is drawn directly in the coordinates of the map.
+"""
+
+import numpy as np
+import cartopy.crs as ccrs
+from climax_grid import grid_hash
+
+
+#%% Projected grids
+
+_projected_grids = {}
+
+
+def _crs_key(crs):
+    """Key of a Cartopy projection (two equal projections have the same key)."""
+    return type(crs).__name__, crs.proj4_init
+
+
+def _regular_lon_lat(lon, lat):
+    """1-D longitudes and latitudes of a regular grid given as 1-D or 2-D (meshgrid) arrays, or None."""
+    lon = np.ma.filled(np.ma.asarray(lon, dtype=np.float64), np.nan)
+    lat = np.ma.filled(np.ma.asarray(lat, dtype=np.float64), np.nan)
+    if lon.ndim == 1 and lat.ndim == 1:
+        return lon, lat
+    if lon.ndim == 2 and lon.shape == lat.shape \
+            and (lon == lon[:1]).all() and (lat == lat[:, :1]).all():
+        return lon[0], lat[:, 0]
+    return None
+
+
+class ProjectedGrid:
+    """
+    A lon/lat grid projected once into the coordinates of a map.
+
+    For regular grids, the longitudes are rolled into the range of the map
+    ([central longitude - 180, central longitude + 180)), repeated longitudes
+    (e.g. the cyclic point at 360°) are dropped, and a column at each edge of
+    the map is interpolated across the seam (unless the grid already has a
+    column on that edge), so the fields are continuous in map coordinates and
+    the map is covered from edge to edge. Curvilinear
+    grids are projected as they are.
+
+    Parameters:
+        lon, lat (array-like): Coordinates of the grid, 1-D or 2-D (degrees).
+        crs (cartopy.crs.Projection): Projection of the map (e.g. ax.projection).
+
+    Example:
+        grid = projected_grid(lon_tas, lat_tas, ax.projection)
+        im_tas = grid.contourf(ax, tas, levels=levels, cmap=cm.batlow)
+        contours = grid.contour(ax, tas, levels=contour_levels, colors='white')
+    """
+
+    def __init__(self, lon, lat, crs):
+        self.crs = crs
+        regular = _regular_lon_lat(lon, lat)
+        if regular is None:
+            # Curvilinear grid: the points are only projected
+            lon2d, lat2d = np.ma.filled(lon, np.nan), np.ma.filled(lat, np.nan)
+            self.order = self.seam = None
+        else:
+            lon1d, lat1d = regular
+            west = crs.proj4_params.get('lon_0', 0) - 180
+            wrapped = (lon1d - west) % 360 + west
+            order = np.argsort(wrapped, kind='stable')
+            keep = np.r_[True, np.diff(wrapped[order]) > 1e-9]  # Drop the repeated longitudes
+            self.order = order[keep]
+            wrapped = wrapped[self.order]
+
+            # Values at the seam: linear between the last column and the first one (+ 360°)
+            gap = wrapped[0] + 360 - wrapped[-1]
+            weight = (west + 360 - wrapped[-1]) / gap if gap > 0 else 0.5
+            self.seam = weight
+
+            # A seam column at each edge of the map, unless a column of the grid already
+            # sits on that edge (e.g. -180° under Robinson()): that column is moved just
+            # inside the edge instead, so x keeps increasing along the rows
+            edge = 1e-6 * (wrapped[-1] - wrapped[0])
+            west_edge, east_edge = west + edge, west + 360 - edge
+            self.edges = bool(wrapped[0] > west_edge), bool(wrapped[-1] < east_edge)
+            wrapped = np.clip(wrapped, west_edge, east_edge)
+            lon1d = np.r_[[west_edge][:self.edges[0]], wrapped, [east_edge][:self.edges[1]]]
+            lon2d, lat2d = np.meshgrid(lon1d, lat1d)
+
+        points = crs.transform_points(ccrs.PlateCarree(), lon2d, lat2d)
+        self.x, self.y = points[..., 0], points[..., 1]
+
+    def __call__(self, data):
+        """Values of a (..., lat, lon) field on the projected grid (last axis reordered and closed)."""
+        if self.order is None:
+            return data
+        data = data[..., self.order]
+        seam = (data[..., -1] * (1 - self.seam) + data[..., 0] * self.seam)[..., None]
+        west_edge, east_edge = self.edges
+        stack = np.ma.concatenate if np.ma.isMaskedArray(data) else np.concatenate
+        return stack([seam] * west_edge + [data] + [seam] * east_edge, axis=-1)
+
+    def contourf(self, ax, data, *args, **kwargs):
+        """ax.contourf of a field of the grid, in map coordinates (no reprojection by Cartopy)."""
+        return ax.contourf(self.x, self.y, self(data), *args, transform=self.crs, **kwargs)
+
+    def contour(self, ax, data, *args, **kwargs):
+        """ax.contour of a field of the grid, in map coordinates (no reprojection by Cartopy)."""
+        return ax.contour(self.x, self.y, self(data), *args, transform=self.crs, **kwargs)
+
+
+def projected_grid(lon, lat, crs):
+    """
+    ProjectedGrid of a grid in a projection, computed once per (grid, projection).
+
+    The cache key is the hash of the coordinates (see climax_grid.grid_hash),
+    so the layers of a map and all the maps of a batch on the same grid and
+    projection share the same projected coordinates.
+    """
+    key = grid_hash(lon, lat), _crs_key(crs)
+    grid = _projected_grids.get(key)
+    if grid is None:
+        grid = _projected_grids[key] = ProjectedGrid(lon, lat, crs)
+    return grid
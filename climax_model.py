@@ -0,0 +1,694 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 10:12:40 2026
+
+@author: nthar
+"""
+
+### !!! CLimate Integrated Modeling and Analysis eXperiment !!! ###
+### !!! Building blocks of the CLIMAX World toy model !!! ###
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from netCDF4 import Dataset
+
+# Order of the axes of the 4-D temperature field (same as in CLIMAX_v1.py)
+AXES = ('lon', 'lat', 'depth', 'time')
+
+
+#%% CO2 forcing
+
+def calculate_forcing(pCO2, baseline_pCO2=280):
+    """
+    Convert a pCO2 concentration into a warming (°C).
+
+    Parameters:
+        pCO2 (float or ndarray): CO2 concentration in ppm.
+        baseline_pCO2 (float): Reference level in ppm (pre-industrial).
+
+    Returns:
+        forcing (float or ndarray): Warming in °C. Doubling pCO2 results
+            in about a 3°C increase.
+    """
+    return 3 * np.log2(np.asarray(pCO2) / baseline_pCO2)
+
+
+#%% Lazy temperature field
+
+def _normalize_key(key, ndim):
+    """Expand an indexing key (ints, slices, 1-D arrays, Ellipsis) to one entry per axis."""
+    if not isinstance(key, tuple):
+        key = (key,)
+    n_ellipsis = sum(k is Ellipsis for k in key)
+    if n_ellipsis > 1:
+        raise IndexError("an index can only have a single ellipsis ('...')")
+    if n_ellipsis == 1:
+        i = next(i for i, k in enumerate(key) if k is Ellipsis)
+        fill = (slice(None),) * (ndim - len(key) + 1)
+        key = key[:i] + fill + key[i + 1:]
+    if len(key) > ndim:
+        raise IndexError(f"too many indices: field is {ndim}-dimensional, but {len(key)} were indexed")
+    return key + (slice(None),) * (ndim - len(key))
+
+
+class TemperatureField:
+    """
+    Lazy 4-D temperature field T[lon, lat, depth, time].
+
+    The field is never stored as a full cube. It is kept as a sum of small
+    terms, each one defined on a subset of the axes (e.g. `depth_effect`
+    on 'depth', `seasonvar` on 'time', a CO2 forcing on no axis at all), and
+    the terms are only broadcast together for the slice that is asked for:
+    `field[:, :, 5, 12]` only allocates a (lon, lat) map.
+
+    Indexing accepts integers, slices and 1-D integer or boolean arrays.
+    Arrays are applied independently on each axis (like netCDF4 variables),
+    not jointly like NumPy fancy indexing.
+
+    Parameters:
+        shape (tuple): Sizes of the (lon, lat, depth, time) axes.
+        terms (list): List of (axes, values) pairs. `axes` is a tuple of
+            axis names taken from AXES, `values` an array whose dimensions
+            follow these axes. Scalars use axes=().
+        dtype (dtype): Storage and output type (np.float32 halves memory).
+    """
+
+    def __init__(self, shape, terms=(), dtype=np.float64):
+        self.shape = tuple(int(n) for n in shape)
+        if len(self.shape) != len(AXES):
+            raise ValueError(f"shape must have {len(AXES)} dimensions {AXES}, got {self.shape}")
+        self.dtype = np.dtype(dtype)
+        self.terms = []
+        for axes, values in terms:
+            self.terms.append(self._check_term(axes, values))
+
+    def _check_term(self, axes, values):
+        axes = tuple(axes)
+        unknown = [ax for ax in axes if ax not in AXES]
+        if unknown:
+            raise ValueError(f"unknown axes {unknown}, expected a subset of {AXES}")
+        if list(axes) != sorted(axes, key=AXES.index):
+            raise ValueError(f"axes of a term must follow the order {AXES}, got {axes}")
+        values = np.asarray(values, dtype=self.dtype)
+        expected = tuple(self.shape[AXES.index(ax)] for ax in axes)
+        if values.shape != expected:
+            raise ValueError(f"term on axes {axes} must have shape {expected}, got {values.shape}")
+        return axes, values
+
+    ### Array-like attributes
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self):
+        """Memory that a fully materialized cube would use."""
+        return self.size * self.dtype.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        terms = ", ".join("(" + ", ".join(axes) + ")" for axes, _ in self.terms)
+        return f"TemperatureField(shape={self.shape}, dtype={self.dtype}, terms=[{terms}])"
+
+    ### Building new fields (the arrays of the terms are shared, never copied)
+    def add_term(self, axes, values):
+        """Return a new field with an extra additive term on `axes`."""
+        return TemperatureField(self.shape, self.terms + [(axes, values)], self.dtype)
+
+    def with_forcing(self, forcing):
+        """Return a new field shifted by a uniform forcing (°C)."""
+        return self.add_term((), forcing)
+
+    def astype(self, dtype):
+        """Return the same field stored (and materialized) as `dtype`."""
+        return TemperatureField(self.shape, self.terms, dtype)
+
+    def isel(self, **indexers):
+        """
+        Return the field restricted to one index on some axes, e.g. isel(depth=5).
+        The selected axes are kept with a length of 1.
+        """
+        shape = list(self.shape)
+        for ax, i in indexers.items():
+            shape[AXES.index(ax)] = 1
+        terms = []
+        for axes, values in self.terms:
+            for pos, ax in enumerate(axes):
+                if ax in indexers:
+                    values = np.take(values, [indexers[ax]], axis=pos)
+            terms.append((axes, values))
+        return TemperatureField(shape, terms, self.dtype)
+
+    ### Reductions (computed from the terms, no cube is materialized)
+    def mean(self, axis=None):
+        """
+        Mean of the field over one or several axes.
+
+        The field is a sum of terms, so its mean is the sum of the means of
+        the terms: the cost only depends on the size of the terms.
+
+        Parameters:
+            axis (str or tuple): Axis name(s) from AXES. None = all axes.
+
+        Returns:
+            mean (ndarray or float): Mean over the remaining axes.
+        """
+        if axis is None:
+            axis = AXES
+        elif isinstance(axis, str):
+            axis = (axis,)
+        kept = [ax for ax in AXES if ax not in axis]
+        out = np.zeros([self.shape[AXES.index(ax)] for ax in kept], dtype=self.dtype)
+        for axes, values in self.terms:
+            reduced = tuple(pos for pos, ax in enumerate(axes) if ax in axis)
+            if reduced:
+                values = values.mean(axis=reduced)
+            term_kept = [ax for ax in axes if ax not in axis]
+            out += values.reshape([out.shape[i] if ax in term_kept else 1 for i, ax in enumerate(kept)])
+        return out if out.ndim else out[()]
+
+    ### Materialization
+    def __getitem__(self, key):
+        key = _normalize_key(key, self.ndim)
+
+        # Indices selected on each axis: a scalar drops the axis, an array keeps it
+        selected = []
+        for ax, k, n in zip(AXES, key, self.shape):
+            idx = np.arange(n)[k]
+            if np.ndim(idx) > 1:
+                raise IndexError(f"only 1-D index arrays are supported (axis '{ax}')")
+            selected.append(idx)
+        kept = [ax for ax, idx in zip(AXES, selected) if np.ndim(idx) == 1]
+        out_shape = tuple(len(idx) for idx in selected if np.ndim(idx) == 1)
+
+        out = np.zeros(out_shape, dtype=self.dtype)
+        for axes, values in self.terms:
+            # Select the requested indices on each axis of the term (last axis first)
+            for pos in range(len(axes) - 1, -1, -1):
+                values = np.take(values, selected[AXES.index(axes[pos])], axis=pos)
+            # Place the remaining axes of the term at their position in the output
+            term_kept = [ax for ax in axes if ax in kept]
+            values = values.reshape([out_shape[i] if ax in term_kept else 1 for i, ax in enumerate(kept)])
+            out += values
+        return out if out.ndim else out[()]
+
+    def materialize(self):
+        """Build the full cube (only for small grids)."""
+        return self[...]
+
+    def __array__(self, dtype=None, copy=None):
+        cube = self.materialize()
+        return cube if dtype is None else cube.astype(dtype, copy=False)
+
+
+def build_temperature_field(lat_effect, depth_effect, seasonvar, nlat, base=15, forcing=None, dtype=np.float64):
+    """
+    Compose the CLIMAX_v1 temperature field as lazy broadcast terms.
+
+    This is the lazy equivalent of:
+        temperature[:, :, :, t] = base + seasonvar[t] + lat_effect[:, None, None] + depth_effect[None, None, :]
+    followed by `+ forcing`.
+
+    Parameters:
+        lat_effect (ndarray): Temperature anomaly per latitude (°C).
+        depth_effect (ndarray): Temperature anomaly per depth level (°C).
+        seasonvar (ndarray): Seasonal anomaly per time step (°C).
+        nlat (int): Size of the second axis of the cube (len(lat)).
+        base (float): Mean temperature (°C).
+        forcing (float): Uniform CO2 forcing (°C), see calculate_forcing (None = no forcing).
+        dtype (dtype): np.float64 (default) or np.float32 to halve memory.
+
+    Returns:
+        field (TemperatureField): Lazy field of shape
+            (len(lat_effect), nlat, len(depth_effect), len(seasonvar)).
+
+    Note: as in CLIMAX_v1.py, `lat_effect[:, None, None]` varies along the
+    first axis of the cube, which is the vertical axis (rows) of the maps.
+    """
+    lat_effect = np.asarray(lat_effect)
+    depth_effect = np.asarray(depth_effect)
+    seasonvar = np.asarray(seasonvar)
+    shape = (len(lat_effect), nlat, len(depth_effect), len(seasonvar))
+
+    terms = [((), base),
+             (('lon',), lat_effect),
+             (('depth',), depth_effect),
+             (('time',), seasonvar)]
+    if forcing is not None:
+        terms.append(((), forcing))
+    return TemperatureField(shape, terms, dtype)
+
+
+#%% Multi-scenario pCO2 sweep
+
+def _scenario_means(offset, base_map, geo_map, zone_ids):
+    """Global, zonal and per-zone means of `base_map + offset` (offset: scalar or (lon, lat) map)."""
+    offset = np.asarray(offset)
+    if offset.ndim == 0:
+        # A uniform offset shifts every mean by the same amount
+        global_mean = base_map.mean() + offset
+        zonal_mean = base_map.mean(axis=1) + offset
+        zone_mean = _zone_means(base_map, geo_map, zone_ids) + offset if geo_map is not None else None
+    else:
+        scenario_map = base_map + offset
+        global_mean = scenario_map.mean()
+        zonal_mean = scenario_map.mean(axis=1)
+        zone_mean = _zone_means(scenario_map, geo_map, zone_ids) if geo_map is not None else None
+    return offset, global_mean, zonal_mean, zone_mean
+
+
+def _zone_means(values, geo_map, zone_ids):
+    """Mean of a (lon, lat) map over each geographical zone."""
+    zones = geo_map.astype(int).ravel()
+    sums = np.bincount(zones, weights=values.ravel(), minlength=zone_ids.max() + 1)
+    counts = np.bincount(zones, minlength=zone_ids.max() + 1)
+    return sums[zone_ids] / counts[zone_ids]
+
+
+# Shared state of the worker processes (sent once per worker, not once per scenario)
+_worker_state = {}
+
+def _init_worker(offset_function, base_map, geo_map, zone_ids):
+    _worker_state.update(offset_function=offset_function, base_map=base_map, geo_map=geo_map, zone_ids=zone_ids)
+
+def _run_scenario(pCO2):
+    state = _worker_state
+    offset = state['offset_function'](pCO2)
+    return _scenario_means(offset, state['base_map'], state['geo_map'], state['zone_ids'])
+
+
+class ScenarioSweep:
+    """
+    Sweep of pCO2 scenarios sharing a single base temperature field.
+
+    The base field is stored once. Each scenario is only an offset added
+    to it: a scalar (uniform CO2 forcing) or a (lon, lat) map (e.g. a polar
+    amplification pattern). The global, zonal and per-zone means of every
+    scenario are computed from the mean map of the base field, so no
+    scenario cube is ever built.
+
+    Parameters:
+        base (TemperatureField): Field without CO2 forcing.
+        pCO2_levels (list): CO2 concentrations in ppm.
+        offset_function (callable): pCO2 -> scalar or (lon, lat) offset (°C).
+            Must be a module-level function when workers > 1.
+        geo_map (ndarray): Optional (lon, lat) map of zone ids for zone_mean.
+        depth (int): Depth index of the means. None = mean over all depths.
+        time (int): Time index of the means. None = mean over all times.
+        workers (int): Number of processes. None or 1 = run in this process;
+            only worth it when offset_function is expensive. With workers > 1,
+            run the sweep under `if __name__ == '__main__':` (the worker
+            processes import the main script on Windows and macOS).
+
+    Attributes (after run):
+        offsets (list): Offset of each scenario.
+        global_mean (ndarray): (n_scenarios,) global mean temperature.
+        zonal_mean (ndarray): (n_scenarios, n_rows) mean of each row of the
+            maps (the axis along which lat_effect varies).
+        zone_ids (ndarray): Zone ids found in geo_map.
+        zone_mean (ndarray): (n_scenarios, n_zones) mean temperature per zone.
+    """
+
+    def __init__(self, base, pCO2_levels, offset_function=calculate_forcing, geo_map=None,
+                 depth=None, time=None, workers=None):
+        self.base = base
+        self.pCO2_levels = list(pCO2_levels)
+        self.offset_function = offset_function
+        self.geo_map = None if geo_map is None else np.asarray(geo_map)
+        self.depth = depth
+        self.time = time
+        self.workers = workers
+        self.zone_ids = None if self.geo_map is None else np.unique(self.geo_map).astype(int)
+        self.offsets = None
+
+    def base_map(self):
+        """(lon, lat) map of the base field at the selected depth/time (or averaged over them)."""
+        selection = {ax: i for ax, i in (('depth', self.depth), ('time', self.time)) if i is not None}
+        field = self.base.isel(**selection) if selection else self.base
+        return field.mean(axis=('depth', 'time'))
+
+    def run(self):
+        """Compute the offsets and the means of every scenario."""
+        base_map = self.base_map()
+        if self.workers and self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(self.offset_function, base_map, self.geo_map, self.zone_ids)) as pool:
+                results = list(pool.map(_run_scenario, self.pCO2_levels))
+        else:
+            results = [_scenario_means(self.offset_function(pCO2), base_map, self.geo_map, self.zone_ids)
+                       for pCO2 in self.pCO2_levels]
+
+        offsets, global_mean, zonal_mean, zone_mean = zip(*results)
+        self.offsets = list(offsets)
+        self.global_mean = np.array(global_mean)
+        self.zonal_mean = np.array(zonal_mean)
+        self.zone_mean = None if self.geo_map is None else np.array(zone_mean)
+        return self
+
+    def field(self, i):
+        """Lazy temperature field of scenario `i` (e.g. sweep.field(0)[:, :, 5, 12])."""
+        if self.offsets is None:
+            self.run()
+        offset = self.offsets[i]
+        if offset.ndim == 0:
+            return self.base.with_forcing(offset)
+        return self.base.add_term(('lon', 'lat'), offset)
+
+    def __len__(self):
+        return len(self.pCO2_levels)
+
+
+#%% Geographical zones
+
+# 0 = ocean, 1 = forest, 2 = desert, 3 = continent, 4 = polar ice cap
+# zone id: (scale, offset, name)
+DEFAULT_ZONE_TABLE = {
+    0: (0.9,  0,   "Ocean"),          # More stable temperature (slight reduction in variations)
+    1: (0.95, 0,   "Forest"),         # Moderate temperature, less variation
+    2: (1,    5,   "Desert"),         # Higher temperature to simulate desert conditions
+    3: (1,    2,   "Continent"),      # Moderate temperature, less variation
+    4: (1,    -15, "Polar ice cap")}  # Colder temperature to simulate polar conditions
+
+# Rectangles of the CLIMAX_v1 world: (zone, row_start, row_stop, col_start, col_stop, name)
+# Painted in this order, so later rectangles overwrite earlier ones
+DEFAULT_ZONE_RECTANGLES = [
+    (4, 0,  2,  0,  None, "Arctic"),
+    (4, 45, None, 0, None, "Antarctic"),
+    (4, 1,  8,  15, 21,   "Greenland"),
+    (3, 5,  20, 5,  15,   "North America"),
+    (3, 20, 35, 12, 18,   "South America"),
+    (3, 5,  18, 25, 45,   "Europe-Asia"),
+    (3, 20, 35, 20, 30,   "Africa"),
+    (3, 30, 40, 35, 45,   "Southeast Asia"),
+    (3, 35, 45, 38, 45,   "Australia"),
+    (2, 15, 20, 22, 28,   "Sahara"),
+    (2, 32, 36, 38, 44,   "Australian desert"),
+    (2, 10, 15, 30, 35,   "Gobi desert"),
+    (1, 25, 30, 15, 20,   "Amazon"),
+    (1, 22, 28, 35, 40,   "Borneo and Sumatra"),
+    (1, 25, 35, 25, 30,   "Congo forest")]
+
+
+def _read_table(path):
+    """Read a whitespace separated text table, ignoring empty lines and '#' comments."""
+    rows = []
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                rows.append(line.split())
+    return rows
+
+
+class ZoneTable:
+    """
+    Temperature modifiers of the geographical zones: zone id -> (scale, offset).
+
+    The modifiers are stored as lookup arrays indexed by zone id, so a whole
+    zone map is converted into scale and offset maps with a single gather
+    (`scale[geo_map]`), whatever the grid resolution and number of zones.
+    Zones missing from the table are left unchanged (scale 1, offset 0).
+
+    Parameters:
+        modifiers (dict): zone id -> (scale, offset) or (scale, offset, name).
+    """
+
+    def __init__(self, modifiers=None):
+        if modifiers is None:
+            modifiers = DEFAULT_ZONE_TABLE
+        size = max(int(zone) for zone in modifiers) + 1 if modifiers else 1
+        self.scale = np.ones(size)
+        self.offset = np.zeros(size)
+        self.names = {}
+        for zone, values in modifiers.items():
+            zone = int(zone)
+            if zone < 0:
+                raise ValueError(f"zone ids must be non-negative integers (0 = ocean), got {zone}")
+            self.scale[zone], self.offset[zone] = values[0], values[1]
+            self.names[zone] = values[2] if len(values) > 2 else f"Zone {zone}"
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load a zone table from a text file with the columns:
+            zone  scale  offset  [name]
+        Lines starting with '#' are comments.
+        """
+        modifiers = {}
+        for row in _read_table(path):
+            zone, scale, offset = int(row[0]), float(row[1]), float(row[2])
+            modifiers[zone] = (scale, offset, " ".join(row[3:]) or f"Zone {zone}")
+        return cls(modifiers)
+
+    def _lookup(self, table, geo_map):
+        zones = np.asarray(geo_map).astype(int)
+        if zones.min(initial=0) < 0:
+            raise ValueError("geo_map contains negative zone ids")
+        if zones.max(initial=0) >= len(table):
+            # Zones that are not in the table: identity modifier
+            fill = 1.0 if table is self.scale else 0.0
+            table = np.concatenate([table, np.full(zones.max() + 1 - len(table), fill)])
+        return table[zones]
+
+    def scale_map(self, geo_map):
+        """Map of the multiplicative factors (same shape as geo_map)."""
+        return self._lookup(self.scale, geo_map)
+
+    def offset_map(self, geo_map):
+        """Map of the additive offsets in °C (same shape as geo_map)."""
+        return self._lookup(self.offset, geo_map)
+
+    def apply(self, values, geo_map):
+        """
+        Apply the zone modifiers: values * scale[zone] + offset[zone].
+
+        Parameters:
+            values (ndarray): Array whose first two axes match geo_map,
+                e.g. temperature[lon, lat, depth, time]. Extra axes are broadcast.
+            geo_map (ndarray): 2-D map of zone ids.
+
+        Returns:
+            modified (ndarray): New array with the modifiers applied.
+        """
+        values = np.asarray(values)
+        extra = (1,) * (values.ndim - 2)
+        scale = self.scale_map(geo_map).reshape(np.shape(geo_map) + extra)
+        offset = self.offset_map(geo_map).reshape(np.shape(geo_map) + extra)
+        return values * scale + offset
+
+
+def paint_zone_map(shape, rectangles=None, background=0):
+    """
+    Build a map of zone ids from a list of rectangles.
+
+    Parameters:
+        shape (tuple): Shape of the map (rows, columns).
+        rectangles (list): (zone, row_start, row_stop, col_start, col_stop[, name])
+            tuples, painted in order. None = DEFAULT_ZONE_RECTANGLES.
+        background (int): Zone of the cells not covered (0 = ocean).
+
+    Returns:
+        geo_map (ndarray): 2-D map of zone ids.
+    """
+    if rectangles is None:
+        rectangles = DEFAULT_ZONE_RECTANGLES
+    geo_map = np.full(shape, background, dtype=int)
+    for zone, r0, r1, c0, c1, *name in rectangles:
+        geo_map[r0:r1, c0:c1] = zone
+    return geo_map
+
+
+def load_zone_rectangles(path):
+    """
+    Load zone rectangles from a text file with the columns:
+        zone  row_start  row_stop  col_start  col_stop  [name]
+    Use '-' for an open bound (e.g. `4 45 - 0 -` paints rows 45 to the end).
+    """
+    rectangles = []
+    for row in _read_table(path):
+        bounds = [None if value == '-' else int(value) for value in row[1:5]]
+        rectangles.append((int(row[0]), *bounds, " ".join(row[5:])))
+    return rectangles
+
+
+def load_zone_map(path, shape=None):
+    """
+    Load a 2-D map of zone ids saved with np.save (.npy) or as a text grid.
+
+    shape (tuple): Expected (lon, lat) shape of the map (None = not checked).
+    """
+    if str(path).endswith('.npy'):
+        geo_map = np.load(path)
+    else:
+        geo_map = np.loadtxt(path, comments='#')
+    geo_map = np.asarray(geo_map).astype(int)
+    if shape is not None and geo_map.shape != tuple(shape):
+        raise ValueError(f"zone map {path} has shape {geo_map.shape}, expected {tuple(shape)} (lon, lat)")
+    return geo_map
+
+
+#%% Time-stepping integrator
+
+class ClimaxIntegrator:
+    """
+    Time-stepping version of the CLIMAX model.
+
+    The temperature state T[lon, lat, depth] relaxes towards the equilibrium
+    temperature of the current day, taken from a TemperatureField (base
+    temperature, latitude, depth and seasonal effects, zone offsets and CO2
+    forcing):
+
+        dT/dt = (T_eq(t) - T) / tau(depth)
+
+    Each step is solved exactly over dt (T += (T_eq - T) * (1 - exp(-dt / tau)))
+    so it stays stable for any number of sub-steps. Only one day of the field
+    is materialized at a time and the day index wraps around the year, so
+    multi-year runs have a constant memory footprint.
+
+    Parameters:
+        field (TemperatureField): Equilibrium field, its time axis being the
+            days of the year (e.g. `temperature_forced` in CLIMAX_v1.py).
+        tau (float or ndarray): Relaxation time in days, scalar or one value
+            per depth level. None = 5 days at the surface to 60 days at depth.
+        substeps (int): Number of sub-steps per day. The equilibrium is
+            interpolated linearly between two days.
+    """
+
+    def __init__(self, field, tau=None, substeps=1):
+        self.field = field
+        nlon, nlat, ndepth, ndays = field.shape
+        self.days_per_year = ndays
+        if tau is None:
+            tau = np.linspace(5, 60, ndepth)
+        self.tau = np.broadcast_to(np.asarray(tau, dtype=field.dtype), (ndepth,))
+        self.substeps = int(substeps)
+        self.dt = 1.0 / self.substeps
+        self.relax = (1 - np.exp(-self.dt / self.tau)).astype(field.dtype)  # Fraction of the gap closed per step
+        self.step_count = 0
+        self.state = self.equilibrium(0.0)
+
+    @property
+    def time(self):
+        """Time since the start of the run (days)."""
+        return self.step_count * self.dt
+
+    def equilibrium(self, t):
+        """Equilibrium temperature [lon, lat, depth] at time t (days, may be fractional)."""
+        day = int(np.floor(t))
+        weight = t - day
+        T_eq = self.field[:, :, :, day % self.days_per_year]
+        if weight > 0:
+            T_next = self.field[:, :, :, (day + 1) % self.days_per_year]
+            T_eq += weight * (T_next - T_eq)
+        return T_eq
+
+    def step(self):
+        """Advance the state by one sub-step."""
+        T_eq = self.equilibrium(self.time + self.dt)
+        self.state += (T_eq - self.state) * self.relax
+        self.step_count += 1
+        return self.state
+
+    def advance_day(self):
+        """Advance the state by one day (all its sub-steps)."""
+        for _ in range(self.substeps):
+            self.step()
+        return self.state
+
+    ### Checkpoint / restart
+    def save_checkpoint(self, path, **extra):
+        """Save the state to a .npz file (written to a temporary file, then renamed)."""
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, state=self.state, step_count=self.step_count, substeps=self.substeps, **extra)
+        os.replace(tmp, path)
+
+    def load_checkpoint(self, path):
+        """Restore the state saved by save_checkpoint and return the extra arrays."""
+        with np.load(path) as checkpoint:
+            if int(checkpoint['substeps']) != self.substeps:
+                raise ValueError(f"checkpoint {path} was written with substeps={int(checkpoint['substeps'])}, "
+                                 f"not {self.substeps}")
+            self.state = checkpoint['state'].astype(self.field.dtype)
+            self.step_count = int(checkpoint['step_count'])
+            return {key: checkpoint[key] for key in checkpoint.files
+                    if key not in ('state', 'step_count', 'substeps')}
+
+    ### Run with streaming NetCDF output
+    def run(self, ndays, path, output_every=1, checkpoint_path=None, checkpoint_every=30,
+            restart=False, complevel=4, coords=None):
+        """
+        Integrate until day `ndays` and stream the results to a NetCDF file.
+
+        Every `output_every` days, the mean state over these days is appended
+        to the file (one record of the unlimited time dimension). The file is
+        chunked by record and compressed with zlib.
+
+        Parameters:
+            ndays (int): Total length of the run in days (counted from day 0,
+                so a restarted run stops at the same day).
+            path (str): Output NetCDF file.
+            output_every (int): Number of days averaged in each record.
+            checkpoint_path (str): .npz checkpoint file. None = no checkpoint.
+            checkpoint_every (int): Write the checkpoint every this many records.
+            restart (bool): Resume from checkpoint_path (if it exists) and
+                append to the existing NetCDF file.
+            complevel (int): zlib compression level (1-9).
+            coords (dict): Optional coordinate values for 'lon', 'lat', 'depth'.
+
+        Returns:
+            path (str): The NetCDF file.
+        """
+        nlon, nlat, ndepth, _ = self.field.shape
+        record = 0
+        total = np.zeros_like(self.state)
+        n_total = 0
+
+        resume = restart and checkpoint_path is not None and os.path.exists(checkpoint_path)
+        if resume:
+            extra = self.load_checkpoint(checkpoint_path)
+            record, n_total, total = int(extra['record']), int(extra['n_total']), extra['total']
+            nc = Dataset(path, 'a')
+            temperature, time = nc.variables['temperature'], nc.variables['time']
+        else:
+            nc = Dataset(path, 'w')
+            coords = coords or {}
+            nc.createDimension('time', None)
+            for name, size in (('lon', nlon), ('lat', nlat), ('depth', ndepth)):
+                nc.createDimension(name, size)
+                var = nc.createVariable(name, 'f8', (name,))
+                var[:] = coords.get(name, np.arange(size))
+            time = nc.createVariable('time', 'f8', ('time',))
+            time.units = 'days since start of run'
+            temperature = nc.createVariable('temperature', self.field.dtype, ('time', 'lon', 'lat', 'depth'),
+                                            zlib=True, complevel=complevel, chunksizes=(1, nlon, nlat, ndepth))
+            temperature.units = 'degC'
+            temperature.long_name = f'Temperature averaged over {output_every} day(s)'
+
+        try:
+            while self.time < ndays - 1e-9:
+                total += self.advance_day()
+                n_total += 1
+                if n_total == output_every or self.time >= ndays - 1e-9:
+                    temperature[record] = total / n_total
+                    time[record] = self.time - (n_total - 1) / 2 - 0.5  # Middle of the averaged days
+                    if n_total < output_every:
+                        # Incomplete last record: kept in the checkpoint and rewritten on restart
+                        break
+                    record += 1
+                    total[...] = 0
+                    n_total = 0
+                    if checkpoint_path is not None and record % checkpoint_every == 0:
+                        nc.sync()  # The records must be on disk before the checkpoint refers to them
+                        self.save_checkpoint(checkpoint_path, record=record, n_total=n_total, total=total)
+        finally:
+            nc.close()
+        if checkpoint_path is not None:
+            self.save_checkpoint(checkpoint_path, record=record, n_total=n_total, total=total)
+        return path
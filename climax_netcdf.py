@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 22:31:09 2026
+
+@author: nthar
+Lazy access to the NetCDF files of the map scripts.
+
+Each file is opened once (open_dataset returns the same object for the same
+path) and its variables are returned as lazy handles: nothing is read until
+a slice is asked for, and a selection by bounding box, time and stride only
+reads the corresponding hyperslab from disk. Listing the variables and their
+attributes only reads the metadata.
+"""
+
+import os
+import numpy as np
+from netCDF4 import Dataset
+
+
+#%% Files
+
+_open_files = {}
+
+
+def open_dataset(path):
+    """Open a NetCDF file, or return it if it is already open."""
+    key = os.path.abspath(path)
+    nc_file = _open_files.get(key)
+    if nc_file is None or not nc_file.dataset.isopen():
+        nc_file = _open_files[key] = NetCDFFile(path)
+    return nc_file
+
+
+def close_all():
+    """Close all the files opened with open_dataset."""
+    for nc_file in _open_files.values():
+        nc_file.close()
+    _open_files.clear()
+
+
+class NetCDFFile:
+    """
+    NetCDF file opened for reading, giving lazy variable handles.
+
+    Example:
+        nc = open_dataset('tos_IPSLCM5A2_deepmip-eocene-p1-x3_v1.0.time_series.nc')
+        nc.describe()                       # Metadata only
+        tos = nc['tos']                     # No data read
+        tos_0 = tos[0]                      # Reads the first time step only
+        tos_box = tos.select(time=0, lat=(-30, 30), lon=(-60, 20), stride=2)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.dataset = Dataset(path, 'r')
+
+    @property
+    def variables(self):
+        """Names of the variables."""
+        return list(self.dataset.variables)
+
+    def __getitem__(self, name):
+        if name not in self.dataset.variables:
+            raise KeyError(f"variable {name!r} not in {self.path} (available: {self.variables})")
+        return LazyVariable(self, name)
+
+    def __contains__(self, name):
+        return name in self.dataset.variables
+
+    def describe(self):
+        """Print the variables with their dimensions, shape and units (no data is read)."""
+        print(f"Variables disponibles dans le fichier NetCDF ({os.path.basename(self.path)}) :")
+        for name, var in self.dataset.variables.items():
+            units = getattr(var, 'units', '')
+            print(f"  {name} {var.dimensions} {var.shape} {units}".rstrip())
+
+    def close(self):
+        if self.dataset.isopen():
+            self.dataset.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+#%% Variables
+
+def _axis_kind(name, var):
+    """'lat', 'lon', 'time' or None, from the name and units of a coordinate variable."""
+    units = getattr(var, 'units', '')
+    if units in ('degrees_north', 'degree_north', 'degrees_N') or name in ('lat', 'latitude', 'nav_lat'):
+        return 'lat'
+    if units in ('degrees_east', 'degree_east', 'degrees_E') or name in ('lon', 'longitude', 'nav_lon'):
+        return 'lon'
+    if 'since' in units or 'time' in name:
+        return 'time'
+    return None
+
+
+def _runs(index):
+    """Split sorted indices into slices of consecutive indices."""
+    if len(index) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(index) != 1) + 1
+    return [slice(run[0], run[-1] + 1) for run in np.split(index, breaks)]
+
+
+def _in_bounds(values, bounds, kind):
+    """Mask of the coordinates inside (min, max); longitudes are compared modulo 360."""
+    lo, hi = bounds
+    if kind == 'lon':
+        return (values - lo) % 360 <= (hi - lo) % 360 if hi - lo < 360 else np.ones(np.shape(values), bool)
+    return (values >= lo) & (values <= hi)
+
+
+class LazyVariable:
+    """
+    Handle of a NetCDF variable: its metadata, and reads on demand.
+
+    Indexing (var[0], var[:, 10:20, ::2]) reads only the requested part of the
+    variable. select() chooses the part by coordinates.
+    """
+
+    def __init__(self, nc_file, name):
+        self.file = nc_file
+        self.name = name
+        self.var = nc_file.dataset.variables[name]
+
+    @property
+    def shape(self):
+        return self.var.shape
+
+    @property
+    def dimensions(self):
+        return self.var.dimensions
+
+    @property
+    def attrs(self):
+        return {key: self.var.getncattr(key) for key in self.var.ncattrs()}
+
+    def __repr__(self):
+        return repr(self.var)  # Header of the netCDF4 variable (metadata only)
+
+    def __getitem__(self, key):
+        return self.var[key]
+
+    def _coordinates(self):
+        """
+        Coordinate variables of the lat, lon and time axes: (kind, variable name, dimensions).
+
+        Regular grids have 1-D coordinates named like their dimension (lat, lon); curvilinear
+        grids (e.g. IPSL nav_lat, nav_lon of dimensions (y, x)) are listed in the
+        'coordinates' attribute.
+        """
+        variables = self.file.dataset.variables
+        names = [dim for dim in self.dimensions if dim in variables]
+        names += getattr(self.var, 'coordinates', '').split()
+        coordinates = {}
+        for name in names:
+            if name in variables and set(variables[name].dimensions) <= set(self.dimensions):
+                kind = _axis_kind(name, variables[name])
+                if kind is not None and kind not in coordinates:
+                    coordinates[kind] = (name, variables[name].dimensions)
+        return coordinates
+
+    def select(self, time=None, lat=None, lon=None, stride=1):
+        """
+        Read the part of the variable inside a bounding box, for some time steps.
+
+        Parameters:
+            time (int, slice or (start, stop)): Time step(s), as indices (None = all).
+                An integer removes the time axis. ValueError if the variable has
+                no time coordinate.
+            lat, lon (tuple): (min, max) bounds in degrees (None = all). The
+                longitude bounds may cross the 0/360° seam, e.g. (-30, 30).
+            stride (int): Keep one point out of `stride` along lat and lon.
+
+        Returns:
+            values (MaskedArray): The hyperslab read from the file.
+            coords (dict): The matching coordinates (e.g. 'lat', 'lon', 'time_counter').
+        """
+        variables = self.file.dataset.variables
+        coordinates = self._coordinates()
+        keys = {dim: slice(None) for dim in self.dimensions}
+
+        # Time axis: indices given directly
+        if time is not None:
+            if 'time' not in coordinates:
+                raise ValueError(f"time={time!r} given, but no time coordinate found for {self.name!r} "
+                                 f"(dimensions {self.dimensions}); index the variable directly instead")
+            time_dim = coordinates['time'][1][0]
+            keys[time_dim] = slice(*time) if isinstance(time, tuple) else time
+
+        # Spatial axes: cells inside the bounding box (only the coordinates are read)
+        masks = {}
+        for kind, bounds in (('lat', lat), ('lon', lon)):
+            if kind in coordinates:
+                name, dims = coordinates[kind]
+                for dim in dims:
+                    keys[dim] = slice(None, None, stride)
+                if bounds is not None:
+                    inside = _in_bounds(variables[name][:], bounds, kind)
+                    masks[dims] = masks[dims] & inside if dims in masks else inside
+
+        pieces = {}
+        for dims, inside in masks.items():
+            for axis, dim in enumerate(dims):
+                # Rows (columns) with at least one cell inside the box
+                other = tuple(a for a in range(inside.ndim) if a != axis)
+                index = np.flatnonzero(inside.any(axis=other) if other else inside)
+                if len(dims) == 1 and coordinates.get('lon', (None, None))[1] == dims:
+                    # The box may cross the seam: read the pieces in the order of the box
+                    runs = _runs(index)
+                    offsets = [(variables[coordinates['lon'][0]][run.start] - lon[0]) % 360 for run in runs]
+                    pieces[dim] = [runs[i] for i in np.argsort(offsets)]
+                elif len(index):
+                    keys[dim] = slice(index[0], index[-1] + 1, stride)
+                else:
+                    keys[dim] = slice(0, 0)
+
+        # Read the hyperslab (one read per piece when the box crosses the seam)
+        def read(keys):
+            key = tuple(keys[dim] for dim in self.dimensions)
+            coords = {}
+            for kind, (name, dims) in coordinates.items():
+                if not (kind == 'time' and isinstance(keys[dims[0]], (int, np.integer))):
+                    coords[name] = variables[name][tuple(keys[dim] for dim in dims)]
+            return self.var[key], coords
+
+        if not pieces:
+            return read(keys)
+        (dim, runs), = pieces.items()
+        # The stride carries on across the seam: each piece starts where the previous one left off
+        parts, consumed = [], 0
+        for run in runs:
+            start = run.start + (-consumed) % stride
+            if start < run.stop:
+                parts.append(read({**keys, dim: slice(start, run.stop, stride)}))
+            consumed += run.stop - run.start
+        if not parts:
+            return read({**keys, dim: slice(0, 0)})
+        axis = [d for d in self.dimensions if not isinstance(keys[d], (int, np.integer))].index(dim)
+        values = np.ma.concatenate([part[0] for part in parts], axis=axis)
+        coords = dict(parts[0][1])
+        lon_name = coordinates['lon'][0]
+        coords[lon_name] = np.ma.concatenate([part[1][lon_name] for part in parts])
+        return values, coords
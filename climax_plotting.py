@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:21:36 2026
+
+@author: nthar
+Plotting helpers shared by the time-series scripts.
+"""
+
+import numpy as np
+import matplotlib.transforms as transforms
+from matplotlib.collections import PatchCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.patches import Rectangle
+
+
+#%% Level-of-detail decimation
+
+def axis_pixels(ax, dpi=None):
+    """Width of an axis in pixels, at the given resolution (None = resolution of the figure)."""
+    fig = ax.get_figure()
+    return max(1, int(ax.get_position().width * fig.get_figwidth() * (dpi or fig.dpi)))
+
+
+def decimation_indices(x, *ys, n_bins):
+    """
+    Rows to keep to draw curves y(x) on `n_bins` pixel columns.
+
+    The x range is split into `n_bins` bins of equal width; in each bin the
+    first and last samples and the samples of minimum and maximum y (for each
+    curve) are kept, so the drawn line covers exactly the same pixels as with
+    all the samples. The first NaN of each gap is kept too, so that the lines
+    stay broken there.
+
+    Parameters:
+        x (array-like): Sorted x values (increasing or decreasing).
+        *ys (array-like): Curves sharing this x axis (e.g. the two edges of a band).
+        n_bins (int): Number of pixel columns (see axis_pixels).
+
+    Returns:
+        idx (ndarray): Sorted row indices (all the rows when there are only a few
+            samples per pixel or when x is not sorted).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    ys = [np.asarray(y, dtype=np.float64) for y in ys]
+    n = len(x)
+    if n <= 2 * (len(ys) + 1) * n_bins:
+        return np.arange(n)
+    reverse = x[0] > x[-1]
+    if reverse:
+        x, ys = x[::-1], [y[::-1] for y in ys]
+    if np.any(np.diff(x) < 0) or not np.isfinite(x[[0, -1]]).all() or x[-1] == x[0]:
+        return np.arange(n)
+
+    # Bins are contiguous runs of rows since x is sorted
+    bins = np.clip(((x - x[0]) / (x[-1] - x[0]) * n_bins).astype(np.int64), 0, n_bins - 1)
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    segment = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+    rows = np.arange(n)
+
+    keep = [starts, np.r_[starts[1:], n] - 1]
+    for y in ys:
+        for extreme in (np.fmin, np.fmax):
+            # First row of each bin reaching the bin minimum (maximum); NaN bins keep nothing
+            value = extreme.reduceat(y, starts)
+            first = np.minimum.reduceat(np.where(y == value[segment], rows, n), starts)
+            keep.append(first[first < n])
+        nan = np.isnan(y)
+        keep.append(np.flatnonzero(nan & ~np.r_[False, nan[:-1]]))
+
+    idx = np.unique(np.concatenate(keep))
+    return (n - 1 - idx)[::-1] if reverse else idx
+
+
+def plot_decimated(ax, x, y, *args, dpi=None, **kwargs):
+    """ax.plot(x, y, ...) drawing only the samples visible at the width of the axis (see decimation_indices)."""
+    x, y = np.asarray(x), np.asarray(y)
+    idx = decimation_indices(x, y, n_bins=axis_pixels(ax, dpi))
+    return ax.plot(x[idx], y[idx], *args, **kwargs)
+
+
+def fill_between_decimated(ax, x, y1, y2, dpi=None, **kwargs):
+    """ax.fill_between(x, y1, y2, ...) drawing only the samples visible at the width of the axis."""
+    x, y1, y2 = np.asarray(x), np.asarray(y1), np.asarray(y2)
+    idx = decimation_indices(x, y1, y2, n_bins=axis_pixels(ax, dpi))
+    return ax.fill_between(x[idx], y1[idx], y2[idx], **kwargs)
+
+
+#%% Geological timescale overlay
+
+# Spans drawn at the bottom of the time axes:
+# name, start (Ma), end (Ma), color, alpha, ymin, ymax, y of the label
+# ymin, ymax and the label y are fractions of the axis height (None = middle of the span)
+PHANEROZOIC_PERIODS = [
+    ("Q",             0,      2.58,   'lightyellow',    1, 0, 0.09, 0.04),
+    ("Neogene",       2.58,   23.04,  'yellow',         1, 0, 0.09, 0.04),
+    ("Paleogene",     23.04,  66,     'coral',          1, 0, 0.09, 0.04),
+    ("Cretaceous",    66,     143.1,  'limegreen',      1, 0, 0.09, 0.04),
+    ("Jurassic",      143.1,  201.4,  'dodgerblue',     1, 0, 0.09, 0.04),
+    ("Triassic",      201.4,  251.9,  'purple',         1, 0, 0.09, 0.04),
+    ("Permian",       251.9,  298.9,  'orangered',      1, 0, 0.09, 0.04),
+    ("Carboniferous", 298.9,  358.86, 'turquoise',      1, 0, 0.09, 0.04),
+    ("Devonian",      358.86, 419.62, 'peru',           1, 0, 0.09, 0.04),
+    ("Silurian",      419.62, 443.1,  'aquamarine',     1, 0, 0.09, 0.04),
+    ("Ordovician",    443.1,  486.85, 'mediumseagreen', 1, 0, 0.09, 0.04)]
+
+ICE_PERIODS = [
+    ("", 0,   34,  'aqua', 1, 0.093, 0.143, None),
+    ("", 260, 370, 'aqua', 1, 0.093, 0.143, None),
+    ("", 430, 460, 'aqua', 1, 0.093, 0.143, None)]
+
+OLIGOCENE_MIOCENE = [
+    ("Oligocene",   23.03, 33.9,  'chocolate',    1,    0,    0.05, 0.022),
+    ("Miocene",     17.0,  23.03, 'yellow',       1,    0,    0.05, 0.022),
+    ("Rupelian",    27.82, 33.9,  'chocolate',    0.65, 0.05, 0.1,  0.073),
+    ("Chattian",    23.03, 27.82, 'chocolate',    0.5,  0.05, 0.1,  0.073),
+    ("Aquitanian",  20.44, 23.03, 'yellow',       0.65, 0.05, 0.1,  0.073),
+    ("Burdigalian", 17.0,  20.44, 'yellow',       0.5,  0.05, 0.1,  0.073),
+    ("MOGI",        26.2,  28.0,  'lightskyblue', 0.5,  0.11, 1,    0.933)]  # Mid-Oligocene Glacial Interval
+
+
+class TimescaleOverlay:
+    """
+    Geological timescale (periods, epochs, stages, events) drawn behind time axes.
+
+    The rectangles and their colors are built once; each axis then gets a
+    single PatchCollection (one artist instead of one patch per span), with x
+    in data coordinates (Ma) and y in fractions of the axis height, so the
+    same overlay can be drawn on many axes and figures.
+
+    Parameters:
+        spans (list): (name, start, end, color, alpha, ymin, ymax, label_y) rows,
+            see PHANEROZOIC_PERIODS. An empty name draws no label.
+
+    Example:
+        periods = TimescaleOverlay(PHANEROZOIC_PERIODS)
+        periods.draw(ax1)
+        periods.draw(ax2)
+    """
+
+    def __init__(self, spans):
+        self.spans = list(spans)
+        self.patches = [Rectangle((start, ymin), end - start, ymax - ymin)
+                        for _, start, end, _, _, ymin, ymax, _ in self.spans]
+        self.facecolors = to_rgba_array([color for _, _, _, color, _, _, _, _ in self.spans],
+                                        alpha=[alpha for _, _, _, _, alpha, _, _, _ in self.spans])
+        self.labels = [(name, (start + end) / 2, (ymin + ymax) / 2 if label_y is None else label_y)
+                       for name, start, end, _, _, ymin, ymax, label_y in self.spans if name]
+
+    def draw(self, ax, zorder=2, labels=True, **text_kwargs):
+        """
+        Draw the spans on an axis.
+
+        Parameters:
+            ax (Axes): Axis whose x axis is the age (Ma).
+            zorder (float): Drawing order of the rectangles.
+            labels (bool): Write the names of the spans.
+            **text_kwargs: Style of the labels (fontsize, fontweight, color, ...).
+
+        Returns:
+            collection (PatchCollection): The rectangles of this axis.
+        """
+        trans = transforms.blended_transform_factory(ax.transData, ax.transAxes)
+        collection = PatchCollection(self.patches, facecolors=self.facecolors, edgecolors='none',
+                                     linewidths=0, transform=trans, zorder=zorder)
+        ax.add_collection(collection, autolim=False)
+        # The x range of the spans is part of the data limits, like with ax.add_patch
+        starts = [start for _, start, _, _, _, _, _, _ in self.spans]
+        ends = [end for _, _, end, _, _, _, _, _ in self.spans]
+        ax.update_datalim([(min(starts), 0), (max(ends), 0)], updatey=False)
+        ax.autoscale_view(scaley=False)
+
+        if labels:
+            text_kwargs = {'ha': 'center', 'va': 'center', 'color': 'black', **text_kwargs}
+            for name, x, y in self.labels:
+                ax.text(x, y, name, transform=trans, **text_kwargs)
+        return collection
+
+
+def load_timescale(path):
+    """
+    Load timescale spans from a text file with the columns:
+        start  end  color  alpha  ymin  ymax  label_y  [name]
+    (ages in Ma, y in fractions of the axis height). Use '-' for a label in
+    the middle of the span.
+    """
+    spans = []
+    with open(path, 'r') as file:
+        for line in file:
+            row = line.split('#', 1)[0].split()
+            if row:
+                start, end, alpha, ymin, ymax = (float(row[i]) for i in (0, 1, 3, 4, 5))
+                label_y = None if row[6] == '-' else float(row[6])
+                spans.append((" ".join(row[7:]), start, end, row[2], alpha, ymin, ymax, label_y))
+    return spans
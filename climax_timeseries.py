@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 19:48:05 2026
+
+@author: nthar
+Time series indexed by age (Ma), shared by the time-series scripts.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+#%% Age-indexed series
+
+class AgeSeries:
+    """
+    Several records (e.g. δ13C and δ18O) sampled on the same age axis.
+
+    The ages are kept sorted (increasing), so an age window is found by binary
+    search (np.searchsorted, O(log n)) instead of hard-coded row numbers, and
+    the window is returned as views of the arrays (no copy).
+
+    Parameters:
+        age (array-like): Ages of the samples (Ma). Decreasing ages are
+            reversed (view); unsorted ages are sorted (copy).
+        **records (array-like): Named records of the same length as age.
+
+    Example:
+        westerhold = AgeSeries(time, d13C=d13C, d18O=d18O)
+        miocene = westerhold.window(17, 23.03)
+        plt.plot(miocene.age, miocene['d18O'])
+    """
+
+    def __init__(self, age, **records):
+        age = np.asarray(age, dtype=np.float64)
+        records = {name: np.asarray(values) for name, values in records.items()}
+        for name, values in records.items():
+            if len(values) != len(age):
+                raise ValueError(f"record {name!r} has {len(values)} samples, age has {len(age)}")
+
+        step = np.diff(age)
+        if np.all(step <= 0) and len(age) > 1:
+            order = slice(None, None, -1)          # Decreasing ages: reversed view
+        elif np.all(step >= 0):
+            order = slice(None)
+        else:
+            order = np.argsort(age, kind='stable')  # Unsorted ages: sorted copy
+        self.age = age[order]
+        self.records = {name: values[order] for name, values in records.items()}
+
+    def __len__(self):
+        return len(self.age)
+
+    def __getitem__(self, name):
+        return self.records[name]
+
+    def __contains__(self, name):
+        return name in self.records
+
+    def bounds(self, start, stop):
+        """Row range [i0, i1) of the samples with start <= age <= stop (Ma, in any order)."""
+        start, stop = min(start, stop), max(start, stop)
+        return (int(np.searchsorted(self.age, start, side='left')),
+                int(np.searchsorted(self.age, stop, side='right')))
+
+    def window(self, start, stop):
+        """Samples with start <= age <= stop (Ma), as views of the arrays of this series."""
+        i0, i1 = self.bounds(start, stop)
+        window = AgeSeries.__new__(AgeSeries)
+        window.age = self.age[i0:i1]
+        window.records = {name: values[i0:i1] for name, values in self.records.items()}
+        return window
+
+    def rolling(self, start, stop, names=None, windows=(100,), stats=('mean',)):
+        """
+        Rolling statistics of the records, computed over an age window only.
+
+        Each statistic over `w` samples only depends on the `w - 1` previous
+        samples, so only the window plus this warm-up margin is processed: the
+        result is the same as a rolling statistic over the full record, then
+        sliced, whatever the length of the record.
+
+        Parameters:
+            start, stop (float): Age window (Ma).
+            names (list): Records to smooth (None = all).
+            windows (int or tuple): Window length(s), in samples.
+            stats (tuple): Statistics of pandas rolling ('mean', 'median', 'std', ...).
+
+        Returns:
+            window (AgeSeries): The window of this series, with one more record per
+                statistic named f'{name}_{stat}_{window}' (e.g. 'd18O_mean_100').
+        """
+        i0, i1 = self.bounds(start, stop)
+        window = self.window(start, stop)
+        for name in (list(self.records) if names is None else names):
+            values = self.records[name]
+            smoother = RollingStats(windows, stats)
+            smoother.warm_up(values[max(0, i0 - smoother.margin):i0])
+            for (stat, length), result in smoother.update(values[i0:i1]).items():
+                window.records[f'{name}_{stat}_{length}'] = result
+        return window
+
+
+#%% Rolling statistics
+
+class RollingStats:
+    """
+    Rolling statistics of a stream of samples, for several window lengths at once.
+
+    Only the last max(windows) - 1 samples are kept between two updates, so new
+    samples can be appended to a long record (e.g. while zooming or reading
+    a file in chunks) without computing the statistics of the whole record again.
+
+    Parameters:
+        windows (int or tuple): Window length(s), in samples.
+        stats (tuple): Statistics of pandas rolling ('mean', 'median', 'std', ...),
+            all computed in a single aggregation per window length.
+
+    Example:
+        smoother = RollingStats(windows=(50, 100), stats=('mean', 'std'))
+        for chunk in chunks:
+            result = smoother.update(chunk)
+            band = result['mean', 100] - result['std', 100], result['mean', 100] + result['std', 100]
+    """
+
+    def __init__(self, windows=(100,), stats=('mean',)):
+        self.windows = tuple(int(w) for w in np.atleast_1d(windows))
+        self.stats = list(stats)
+        self.margin = max(self.windows) - 1
+        self.tail = np.empty(0)
+
+    def warm_up(self, values):
+        """Feed samples that precede the ones of interest, without computing their statistics."""
+        buffer = np.concatenate([self.tail, np.asarray(values, dtype=np.float64)])
+        self.tail = buffer[len(buffer) - self.margin:] if self.margin else buffer[:0]
+
+    def update(self, values):
+        """
+        Append new samples and return their rolling statistics.
+
+        Returns:
+            result (dict): (stat, window) -> array of the same length as values
+                (NaN while fewer than `window` samples have been seen).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        buffer = pd.Series(np.concatenate([self.tail, values]))
+        skip = len(self.tail)
+        result = {}
+        for window in self.windows:
+            table = buffer.rolling(window).agg(self.stats)
+            for stat in self.stats:
+                result[stat, window] = table[stat].to_numpy()[skip:]
+        self.warm_up(values)
+        return result
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 21:47:52 2026
+
+@author: nthar
+Fast rendering of a rotating globe (orthographic view) for 3D_Earth.py.
+
+Instead of drawing a 3-D polygon mesh with matplotlib (plot_surface, one
+face per orography cell, depth-sorted at every frame), each pixel of the
+image is projected back onto the sphere: the latitude and longitude seen
+by the pixel give the orography cell, whose color is read from a table
+computed once. A frame is a few vectorized NumPy operations, the frames are
+rendered in parallel and sent as raw RGB images to ffmpeg.
+
+For high-resolution orography, the grid is reduced (level of detail) to
+the resolution the frames can show, and the reduced grid, its Cartesian
+coordinates and its colors are cached on disk per (file, level).
+"""
+
+import os
+import hashlib
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.colors import LightSource
+from netCDF4 import Dataset
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+#%% Renderer
+
+class GlobeRenderer:
+    """
+    Orthographic view of a lat/lon field colored with a colormap.
+
+    Parameters:
+        orog (ndarray): Field of shape (lat, lon) (e.g. the orography).
+        lat, lon (ndarray): Regular 1-D coordinates (degrees). Default: the
+            grid of 3D_Earth.py, linspace(-90, 90) and linspace(0, 360).
+        cmap (str or Colormap): Colormap applied to orog / orog.max().
+        rgba (ndarray): Colors of the cells, shape (lat, lon, 4) uint8, used
+            instead of cmap (e.g. from load_globe).
+        width, height (int): Size of the frames (pixels, even for the video encoders).
+        fill (float): Diameter of the globe as a fraction of min(width, height).
+        title (str): Title written at the top of the frames.
+        background (tuple): RGB color around the globe.
+
+    Example:
+        renderer = GlobeRenderer(orog, width=1350, height=626, title='3D Earth')
+        plt.imshow(renderer.frame(azim=0, elev=-20))
+    """
+
+    def __init__(self, orog, lat=None, lon=None, cmap='terrain', width=1350, height=626, fill=0.85,
+                 title=None, background=(255, 255, 255), rgba=None):
+        orog = np.ma.filled(np.ma.asarray(orog, dtype=np.float64), np.nan)
+        nlat, nlon = orog.shape
+        self.lat = np.linspace(-90, 90, nlat) if lat is None else np.asarray(lat, dtype=np.float64)
+        self.lon = np.linspace(0, 360, nlon) if lon is None else np.asarray(lon, dtype=np.float64)
+        self.shape = (nlat, nlon)
+
+        # Color of each cell, computed once (uint8 RGB, flattened for np.take)
+        if rgba is None:
+            cmap = plt.get_cmap(cmap) if isinstance(cmap, str) else cmap
+            rgba = cmap(orog / np.nanmax(orog), bytes=True)
+        self.colors = rgba[..., :3].reshape(-1, 3)
+
+        # Pixels covered by the globe, as unit vectors in the view frame (computed once):
+        # u to the right, v upwards, w towards the viewer
+        self.width, self.height = width, height
+        radius = fill * min(width, height) / 2
+        cols, rows = np.meshgrid(np.arange(width), np.arange(height))
+        u = (cols + 0.5 - width / 2) / radius
+        v = (height / 2 - rows - 0.5) / radius
+        inside = u**2 + v**2 <= 1
+        self.pixels = np.flatnonzero(inside)
+        self.u, self.v = u[inside], v[inside]
+        self.w = np.sqrt(1 - self.u**2 - self.v**2)
+
+        # Frame without the globe (background and title), copied for each frame
+        self.background = self._background(title, background)
+
+    @classmethod
+    def from_file(cls, path, varname='orog', width=1350, height=626, fill=0.85, level='auto',
+                  exaggeration=0, cmap='terrain', cache_dir='globe_cache', **kwargs):
+        """
+        Renderer of a NetCDF orography file at the level of detail of the frames.
+
+        With level='auto', the coarsest level of the orography pyramid that still
+        has at least one cell per pixel of the globe is used (see load_globe).
+        """
+        diameter = fill * min(width, height)
+        globe = load_globe(path, varname, level=level, diameter=diameter, exaggeration=exaggeration,
+                           cmap=cmap, cache_dir=cache_dir)
+        return cls(globe['orog'], globe['lat'], globe['lon'], width=width, height=height, fill=fill,
+                   rgba=globe['rgba'], **kwargs)
+
+    def _background(self, title, color):
+        """Background image with the title, drawn once with matplotlib."""
+        if not title:
+            return np.tile(np.array(color, dtype=np.uint8), (self.height, self.width, 1))
+        fig = Figure(figsize=(self.width / 100, self.height / 100), dpi=100,
+                     facecolor=np.array(color) / 255)
+        fig.suptitle(title, fontsize=16, fontfamily='Times New Roman')
+        canvas = FigureCanvasAgg(fig)
+        canvas.draw()
+        return np.asarray(canvas.buffer_rgba())[:self.height, :self.width, :3].copy()
+
+    def cells(self, azim, elev):
+        """
+        Flat index (lat * nlon + lon) of the cell seen by each globe pixel, for a view
+        centred on longitude `azim` and latitude `elev` (as ax.view_init(elev, azim)).
+        """
+        az, el = np.radians(azim), np.radians(elev)
+        centre = np.array([np.cos(el) * np.cos(az), np.cos(el) * np.sin(az), np.sin(el)])
+        east = np.array([-np.sin(az), np.cos(az), 0.0])
+        north = np.array([-np.sin(el) * np.cos(az), -np.sin(el) * np.sin(az), np.cos(el)])
+
+        # Point of the sphere behind each pixel, in Earth coordinates
+        x = self.w * centre[0] + self.u * east[0] + self.v * north[0]
+        y = self.w * centre[1] + self.u * east[1] + self.v * north[1]
+        z = self.w * centre[2] + self.u * east[2] + self.v * north[2]
+        lat = np.degrees(np.arcsin(np.clip(z, -1, 1)))
+        lon = np.degrees(np.arctan2(y, x))
+
+        # Nearest cell of the regular grid (the longitude wraps around)
+        nlat, nlon = self.shape
+        i = np.rint((lat - self.lat[0]) / (self.lat[-1] - self.lat[0]) * (nlat - 1)).astype(np.int64)
+        lon_step = (self.lon[-1] - self.lon[0]) / (nlon - 1)
+        j = np.rint(((lon - self.lon[0]) % 360) / lon_step).astype(np.int64) % nlon
+        return np.clip(i, 0, nlat - 1) * nlon + j
+
+    def frame(self, azim, elev=0):
+        """RGB image (height, width, 3) of the globe seen from (elev, azim), uint8."""
+        image = self.background.copy()
+        image.reshape(-1, 3)[self.pixels] = np.take(self.colors, self.cells(azim, elev), axis=0)
+        return image
+
+
+#%% Level of detail and cache
+
+EARTH_RADIUS = 6371e3  # m
+
+
+def downsample(field, factor=2):
+    """
+    Average blocks of factor x factor cells (NaN ignored, NaN for blocks of NaN only);
+    the last rows/columns that do not fill a block are dropped.
+    """
+    nlat, nlon = (n // factor * factor for n in field.shape[-2:])
+    blocks = field[..., :nlat, :nlon].reshape(field.shape[:-2] + (nlat // factor, factor, nlon // factor, factor))
+    count = np.sum(~np.isnan(blocks), axis=(-3, -1))
+    total = np.nansum(blocks, axis=(-3, -1))
+    return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def _pairs_mean(coord):
+    """Coordinates of the downsampled grid (mean of each pair of cells)."""
+    return coord[:len(coord) // 2 * 2].reshape(-1, 2).mean(axis=1)
+
+
+def orography_pyramid(orog, lat, lon, min_size=16):
+    """
+    Multi-resolution orography: level 0 is the native grid, each next level has
+    half the resolution, down to `min_size` latitudes.
+
+    Returns:
+        levels (list): (orog, lat, lon) of each level.
+    """
+    levels = [(orog, lat, lon)]
+    while min(levels[-1][0].shape) // 2 >= min_size:
+        orog, lat, lon = levels[-1]
+        levels.append((downsample(orog), _pairs_mean(lat), _pairs_mean(lon)))
+    return levels
+
+
+def auto_level(shapes, diameter):
+    """
+    Coarsest level still showing at least one cell per pixel at the centre of the globe.
+
+    At the centre of an orthographic view, one pixel spans 360 / (pi * diameter)
+    degrees, and a level of nlat latitudes has cells of 180 / (nlat - 1) degrees.
+    """
+    needed = np.pi * diameter / 2
+    for level in range(len(shapes) - 1, -1, -1):
+        if shapes[level][0] - 1 >= needed:
+            return level
+    return 0
+
+
+def _file_key(path, varname):
+    """Key of a file in the cache (path, modification time and size, variable)."""
+    stat = os.stat(path)
+    text = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{varname}"
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def _save_npz(path, **arrays):
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def _read_pyramid(path, varname):
+    """Read the orography of a NetCDF file (masked values -> NaN) and build its pyramid."""
+    with Dataset(path, 'r') as nc:
+        orog = np.ma.filled(np.ma.asarray(nc.variables[varname][:], dtype=np.float64), np.nan)
+    nlat, nlon = orog.shape
+    return orography_pyramid(orog, np.linspace(-90, 90, nlat), np.linspace(0, 360, nlon))
+
+
+def load_globe(path, varname='orog', level='auto', diameter=None, exaggeration=0, cmap='terrain',
+               cache_dir='globe_cache'):
+    """
+    Orography of a NetCDF file at one level of detail, with its Cartesian
+    coordinates and colors, through a disk cache.
+
+    The grid of the level and its coordinates on the unit sphere are cached
+    per (file, level), and the colors per (file, level, colormap,
+    exaggeration): another exaggeration only rescales the radius and
+    recomputes the colors, and repeated renders read everything from the
+    cache without opening the NetCDF file.
+
+    Parameters:
+        path (str): NetCDF file with a (lat, lon) variable, on the regular grid
+            linspace(-90, 90) x linspace(0, 360) of 3D_Earth.py.
+        varname (str): Variable name.
+        level (int or 'auto'): Level of the pyramid (0 = native grid), or 'auto'
+            to choose it from `diameter` (see auto_level).
+        diameter (float): Diameter of the globe in pixels (for level='auto').
+        exaggeration (float): Vertical exaggeration of the relief: the radius is
+            1 + exaggeration * orog / EARTH_RADIUS, and the colors are shaded
+            with a hillshade of the exaggerated relief (0 = flat colors).
+        cmap (str): Colormap applied to orog / orog.max() (of the native grid).
+        cache_dir (str): Folder of the cache files.
+
+    Returns:
+        globe (dict): level, lat, lon, orog (lat, lon), x, y, z (lat, lon) and rgba (lat, lon, 4) uint8.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    key = _file_key(path, varname)
+    index_file = os.path.join(cache_dir, f"globe_{key}_levels.npz")
+
+    if os.path.exists(index_file):
+        with np.load(index_file) as f:
+            shapes, orog_max = f['shapes'], float(f['orog_max'])
+        levels = None
+    else:
+        levels = _read_pyramid(path, varname)
+        shapes, orog_max = np.array([lev[0].shape for lev in levels]), np.nanmax(levels[0][0])
+        _save_npz(index_file, shapes=shapes, orog_max=orog_max)
+
+    if level == 'auto':
+        level = 0 if diameter is None else auto_level(shapes, diameter)
+    level = int(level)
+
+    # Grid of the level and its coordinates on the unit sphere
+    grid_file = os.path.join(cache_dir, f"globe_{key}_L{level}.npz")
+    names = ('lat', 'lon', 'orog', 'x', 'y', 'z')
+    globe = None
+    if os.path.exists(grid_file):
+        with np.load(grid_file) as f:
+            if set(names) <= set(f.files):  # Older cache files have no coordinates
+                globe = {name: f[name] for name in names}
+    if globe is None:
+        if levels is None:
+            levels = _read_pyramid(path, varname)
+        orog, lat, lon = levels[level]
+        lat_grid, lon_grid = np.meshgrid(np.radians(lat), np.radians(lon), indexing='ij')
+        globe = {'lat': lat, 'lon': lon, 'orog': orog,
+                 'x': np.cos(lat_grid) * np.cos(lon_grid),
+                 'y': np.cos(lat_grid) * np.sin(lon_grid),
+                 'z': np.sin(lat_grid)}
+        _save_npz(grid_file, **globe)
+
+    # Exaggerated relief: the unit sphere is scaled by the radius of each cell
+    if exaggeration:
+        radius = 1 + exaggeration * np.nan_to_num(globe['orog']) / EARTH_RADIUS
+        globe.update({axis: radius * globe[axis] for axis in ('x', 'y', 'z')})
+
+    # Colors of the level (cheap to add for another colormap or exaggeration)
+    cmap_name = cmap if isinstance(cmap, str) else cmap.name
+    colors_file = os.path.join(cache_dir, f"globe_{key}_L{level}_x{exaggeration:g}_{cmap_name}.npz")
+    if os.path.exists(colors_file):
+        with np.load(colors_file) as f:
+            rgba = f['rgba']
+    else:
+        cmap = plt.get_cmap(cmap) if isinstance(cmap, str) else cmap
+        rgba = cmap(globe['orog'] / orog_max)
+        if exaggeration:
+            # Hillshade of the exaggerated relief (cell size in m at the equator)
+            lat, lon = globe['lat'], globe['lon']
+            dy = np.radians(abs(lat[1] - lat[0])) * EARTH_RADIUS
+            dx = np.radians(abs(lon[1] - lon[0])) * EARTH_RADIUS
+            shade = LightSource(azdeg=315, altdeg=45).hillshade(np.nan_to_num(globe['orog']),
+                                                                vert_exag=exaggeration, dx=dx, dy=dy)
+            rgba[..., :3] *= (0.6 + 0.4 * shade)[..., None]
+        rgba = np.round(rgba * 255).astype(np.uint8)
+        _save_npz(colors_file, rgba=rgba)
+
+    return {'level': level, **globe, 'rgba': rgba}
+
+
+#%% Animation
+
+_renderer = None
+
+
+def _init_worker(renderer):
+    global _renderer
+    _renderer = renderer
+
+
+def _render_frame(view):
+    azim, elev = view
+    return _renderer.frame(azim, elev).tobytes()
+
+
+def render_animation(renderer, path, azims, elev=0, fps=60, workers=None, ffmpeg=None, crf=18):
+    """
+    Render a rotation of the globe to a video file.
+
+    The frames are rendered in parallel by a pool of processes and written, in
+    order, as raw RGB images to the standard input of ffmpeg (no matplotlib
+    figure and no temporary image file).
+
+    Parameters:
+        renderer (GlobeRenderer): Globe to render.
+        path (str): Output video (e.g. '3D_Earth.mp4').
+        azims (array-like): Longitude of the centre of the view for each frame (degrees).
+        elev (float or array-like): Latitude of the centre of the view (degrees).
+        fps (int): Frames per second.
+        workers (int): Number of processes (None = number of cores, 1 = no pool).
+        ffmpeg (str): ffmpeg executable (default: matplotlib's animation.ffmpeg_path).
+        crf (int): Quality of the H.264 encoding (lower = better, 18 is visually lossless).
+
+    Returns:
+        path (str): The output video.
+    """
+    views = list(zip(np.ravel(azims), np.broadcast_to(elev, np.shape(np.ravel(azims)))))
+    command = [ffmpeg or matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{renderer.width}x{renderer.height}',
+               '-r', str(fps), '-i', '-',
+               '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', str(crf), path]
+
+    encoder = subprocess.Popen(command, stdin=subprocess.PIPE)
+    try:
+        if workers == 1:
+            _init_worker(renderer)
+            for view in views:
+                encoder.stdin.write(_render_frame(view))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(renderer,)) as pool:
+                # map keeps the order of the frames; chunks limit the inter-process traffic
+                for frame in pool.map(_render_frame, views, chunksize=4):
+                    encoder.stdin.write(frame)
+    finally:
+        encoder.stdin.close()
+        if encoder.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed (exit code {encoder.returncode}) while writing {path}")
+    return path
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 17:02:48 2026
+
+@author: nthar
+"""
+
+"""
+Author: Nicolas Tharaud : nicolas.tharaud@lsce.ipsl.fr
+Description:
+------------
+Cache persistant (fichier SQLite) des reconstructions paléogéographiques,
+partagé par Paleocoordinate_Reconstruction_Fixed_Age.py et
+Paleocoordinate_Reconstruction_Dynamic_Time.py.
+
+Chaque résultat est enregistré avec la clé
+(longitude arrondie, latitude arrondie, âge, modèle). Lors d'une nouvelle
+exécution, seuls les points absents du cache sont envoyés à GPlates ; si le
+service est injoignable, les résultats déjà en cache sont tout de même
+renvoyés.
+
+La taille du cache est limitée : au-delà de `max_entries` résultats, les
+moins récemment utilisés sont supprimés.
+===============================================================================
+"""
+
+### ======================== Libraries =========================== ###
+
+import sqlite3
+import time
+import numpy as np
+
+
+### ======================== Cache =========================== ###
+
+class ReconstructionCache:
+    """
+    Cache SQLite des coordonnées paléo.
+
+    Paramètres :
+        path (str) : Fichier SQLite (créé s'il n'existe pas).
+        max_entries (int) : Nombre maximal de résultats conservés (None = illimité).
+        precision (int) : Nombre de décimales des coordonnées dans la clé
+            (4 décimales, soit environ 10 m).
+    """
+
+    def __init__(self, path="gplates_cache.sqlite", max_entries=1_000_000, precision=4):
+        self.path = path
+        self.max_entries = max_entries
+        self.precision = precision
+        self.scale = 10 ** precision
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS points (
+                               lon INTEGER, lat INTEGER, age REAL, model TEXT,
+                               pallon REAL, pallat REAL, last_used REAL,
+                               PRIMARY KEY (lon, lat, age, model))""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS points_last_used ON points (last_used)")
+        self.db.commit()
+
+    def _keys(self, lons, lats):
+        """Coordonnées arrondies (entiers) utilisées comme clé."""
+        lons = np.round(np.asarray(lons, dtype=float) * self.scale).astype(np.int64)
+        lats = np.round(np.asarray(lats, dtype=float) * self.scale).astype(np.int64)
+        return lons, lats
+
+    def get(self, lons, lats, age, model):
+        """
+        Cherche des points dans le cache.
+
+        Retour :
+            pallon, pallat (ndarray) : Coordonnées paléo (NaN si absentes ou non reconstruites).
+            found (ndarray) : True pour les points présents dans le cache.
+        """
+        n = len(lons)
+        pallon = np.full(n, np.nan)
+        pallat = np.full(n, np.nan)
+        found = np.zeros(n, dtype=bool)
+        if n == 0:
+            return pallon, pallat, found
+
+        # Les clés recherchées sont placées dans une table temporaire et jointes au cache
+        lon_keys, lat_keys = self._keys(lons, lats)
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS query (i INTEGER, lon INTEGER, lat INTEGER)")
+        self.db.execute("DELETE FROM query")
+        self.db.executemany("INSERT INTO query VALUES (?, ?, ?)",
+                            zip(range(n), lon_keys.tolist(), lat_keys.tolist()))
+        rows = self.db.execute("""SELECT q.i, p.pallon, p.pallat FROM query q
+                                  JOIN points p ON p.lon = q.lon AND p.lat = q.lat
+                                  WHERE p.age = ? AND p.model = ?""", (float(age), model)).fetchall()
+        self.db.execute("""UPDATE points SET last_used = ? WHERE age = ? AND model = ?
+                           AND (lon, lat) IN (SELECT lon, lat FROM query)""", (time.time(), float(age), model))
+        self.db.commit()
+
+        for i, plon, plat in rows:
+            found[i] = True
+            pallon[i] = np.nan if plon is None else plon
+            pallat[i] = np.nan if plat is None else plat
+        self.hits += int(found.sum())
+        self.misses += int(n - found.sum())
+        return pallon, pallat, found
+
+    def put(self, lons, lats, age, model, pallon, pallat):
+        """Enregistre des résultats (NaN = point que le modèle ne peut pas reconstruire)."""
+        lon_keys, lat_keys = self._keys(lons, lats)
+        now = time.time()
+        values = [(lon, lat, float(age), model,
+                   None if np.isnan(plon) else float(plon), None if np.isnan(plat) else float(plat), now)
+                  for lon, lat, plon, plat in zip(lon_keys.tolist(), lat_keys.tolist(), pallon, pallat)]
+        self.db.executemany("INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?, ?, ?, ?)", values)
+        self.stored += len(values)
+        self._evict()
+        self.db.commit()
+
+    def _evict(self):
+        """Supprime les résultats les moins récemment utilisés au-delà de max_entries."""
+        if self.max_entries is None:
+            return
+        count = self.db.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.db.execute("""DELETE FROM points WHERE rowid IN
+                               (SELECT rowid FROM points ORDER BY last_used LIMIT ?)""", (excess,))
+            self.evicted += excess
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+
+    def report(self):
+        """Affiche les statistiques d'utilisation du cache."""
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        print(f"Cache {self.path} : {self.hits} points trouvés, {self.misses} absents "
+              f"({rate:.1f} % de réussite), {self.stored} enregistrés, {self.evicted} supprimés, "
+              f"{len(self)} points en cache.")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
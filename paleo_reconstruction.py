@@ -0,0 +1,489 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 16:20:31 2026
+
+@author: nthar
+"""
+
+"""
+Author: Nicolas Tharaud : nicolas.tharaud@lsce.ipsl.fr
+Description:
+------------
+Fonctions communes aux scripts de reconstruction paléogéographique
+(Paleocoordinate_Reconstruction_Fixed_Age.py et
+Paleocoordinate_Reconstruction_Dynamic_Time.py).
+
+Au lieu d'envoyer une requête HTTP par point, les points sont regroupés
+en lots : chaque requête `reconstruct_points` de l'API GPlates contient
+plusieurs couples longitude,latitude, dans la limite d'une longueur d'URL
+et d'un nombre de points configurables. Les coordonnées renvoyées sont
+ensuite replacées dans l'ordre des points d'entrée.
+
+Les points que le modèle de plaques ne peut pas reconstruire reçoivent NaN.
+
+Le paramètre `backend` permet aussi de reconstruire les points hors ligne
+('local') avec le moteur de rotations de plate_rotation.py.
+===============================================================================
+"""
+
+### ======================== Libraries =========================== ###
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import requests
+
+
+### ======================== GPlates Parameters =========================== ###
+
+# URL de l'API GPlates pour la reconstruction de points
+GPLATES_URL = "https://gws.gplates.org/reconstruct/reconstruct_points/"
+
+# Modèle tectonique utilisé par défaut
+DEFAULT_MODEL = "MULLER2022"
+
+# Taille maximale d'un lot (nombre de points et longueur du paramètre `points`)
+MAX_POINTS = 500
+MAX_URL_LENGTH = 6000
+
+
+### ======================== Batching =========================== ###
+
+def format_point(lon, lat):
+    """Texte 'lon,lat' envoyé à l'API (5 décimales, soit environ 1 m)."""
+    return f"{lon:.5f}".rstrip('0').rstrip('.') + "," + f"{lat:.5f}".rstrip('0').rstrip('.')
+
+
+def make_batches(lons, lats, max_points=MAX_POINTS, max_url_length=MAX_URL_LENGTH):
+    """
+    Découpe les points en lots respectant les limites de taille des requêtes.
+
+    Paramètres :
+        lons, lats (ndarray) : Coordonnées modernes (degrés décimaux).
+        max_points (int) : Nombre maximal de points par requête.
+        max_url_length (int) : Longueur maximale du paramètre `points` (caractères).
+
+    Retour :
+        batches (list) : Liste de tableaux d'indices (positions dans lons/lats).
+    """
+    batches = []
+    current = []
+    length = 0
+    for i, (lon, lat) in enumerate(zip(lons, lats)):
+        size = len(format_point(lon, lat)) + 1  # +1 pour la virgule de séparation
+        if current and (len(current) >= max_points or length + size > max_url_length):
+            batches.append(np.array(current))
+            current, length = [], 0
+        current.append(i)
+        length += size
+    if current:
+        batches.append(np.array(current))
+    return batches
+
+
+### ======================== HTTP client =========================== ###
+
+class TokenBucket:
+    """
+    Limiteur de débit (seau à jetons) partagé par les requêtes simultanées.
+
+    Chaque requête consomme un jeton ; les jetons se régénèrent à `rate`
+    par seconde. Quand le serveur signale une surcharge (HTTP 429 ou 5xx),
+    le débit est divisé par deux, puis il remonte progressivement après
+    chaque réponse correcte (remplace la pause fixe time.sleep(0.1)).
+
+    Paramètres :
+        rate (float) : Débit initial et maximal (requêtes par seconde).
+        capacity (float) : Nombre de requêtes pouvant partir d'un coup.
+        min_rate (float) : Débit minimal après ralentissement.
+    """
+
+    def __init__(self, rate=10, capacity=None, min_rate=0.2):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.capacity = float(capacity if capacity is not None else max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Attend qu'un jeton soit disponible puis le consomme."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def slow_down(self, pause=0):
+        """Surcharge du serveur : débit divisé par deux et pause optionnelle (Retry-After)."""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0) - pause * self.rate
+
+    def speed_up(self):
+        """Réponse correcte : le débit remonte doucement vers le maximum."""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + 0.1 * self.max_rate)
+
+
+class GPlatesClient:
+    """
+    Client HTTP pour l'API GPlates : connexions persistantes (keep-alive)
+    réutilisées, plusieurs requêtes simultanées et débit adaptatif.
+
+    Paramètres :
+        url (str) : URL du service `reconstruct_points` (peut pointer vers un
+            serveur local de test qui imite l'API).
+        max_workers (int) : Nombre maximal de requêtes simultanées.
+        rate (float) : Débit maximal (requêtes par seconde).
+        max_retries (int) : Nombre de nouvelles tentatives pour une requête
+            en échec (erreur réseau, HTTP 429 ou 5xx).
+        timeout (float) : Délai maximal d'une requête (secondes).
+    """
+
+    def __init__(self, url=GPLATES_URL, max_workers=4, rate=10, max_retries=4, timeout=60):
+        self.url = url
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, params):
+        """Envoie une requête GET (avec nouvelles tentatives) et renvoie la réponse JSON."""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.get(self.url, params=params, timeout=self.timeout)
+            except requests.RequestException:
+                if attempt == self.max_retries:
+                    raise
+                self.bucket.slow_down(pause=2 ** attempt)
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                # Serveur surchargé : on ralentit et on réessaie
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                retry_after = response.headers.get("Retry-After", "")
+                self.bucket.slow_down(pause=float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+                continue
+
+            response.raise_for_status()
+            self.bucket.speed_up()
+            return response.json()
+
+    def map(self, function, tasks):
+        """Exécute function(task) pour chaque tâche, au plus max_workers à la fois (ordre de fin)."""
+        if self.max_workers <= 1:
+            for task in tasks:
+                yield function(task)
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for future in as_completed([pool.submit(function, task) for task in tasks]):
+                yield future.result()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+### ======================== Requests =========================== ###
+
+def request_batch(lons, lats, age, model=DEFAULT_MODEL, client=None):
+    """
+    Envoie une requête `reconstruct_points` pour un lot de points.
+
+    Retour :
+        coords (list) : Liste des coordonnées renvoyées par l'API
+            ([lon, lat] ou None pour un point non reconstruit).
+    """
+    points = ",".join(format_point(lon, lat) for lon, lat in zip(lons, lats))
+    # return_null_points : l'API renvoie null pour les points non reconstruits
+    # (sinon ils sont omis et l'ordre des points serait perdu)
+    params = {"points": points, "time": age, "model": model, "return_null_points": ""}
+    data_json = (client or GPlatesClient(max_workers=1)).get(params)
+    coords = data_json.get("coordinates") if isinstance(data_json, dict) else None
+    if not isinstance(coords, list):
+        raise ValueError(f"réponse inattendue de l'API : {data_json}")
+    return coords
+
+
+def _scatter(coords, idx, pallon, pallat):
+    """Range les coordonnées renvoyées dans les tableaux de sortie (positions idx)."""
+    for i, point in zip(idx, coords):
+        if isinstance(point, (list, tuple)) and len(point) >= 2 and None not in point[:2]:
+            pallon[i], pallat[i] = point[0], point[1]
+
+
+def _reconstruct_batch(lons, lats, idx, age, model, client, pallon, pallat, answered, verbose):
+    """
+    Reconstruit un lot ; s'il manque des points dans la réponse, le lot est coupé en deux.
+    `answered` est mis à True pour les points dont l'API a donné le résultat (même NaN).
+    """
+    try:
+        coords = request_batch(lons[idx], lats[idx], age, model, client)
+    except Exception as e:
+        # Gestion des erreurs (problème réseau, réponse invalide, etc.) après les nouvelles tentatives
+        if isinstance(e, requests.HTTPError) and e.response is not None:
+            e = f"erreur HTTP {e.response.status_code}"  # L'URL complète serait trop longue à afficher
+        print(f"Erreur pour un lot de {len(idx)} points à {age} Ma : {e}")
+        return
+
+    if len(coords) == len(idx):
+        _scatter(coords, idx, pallon, pallat)
+        answered[idx] = True
+    elif len(idx) == 1:
+        answered[idx] = True
+        # Cas où la reconstruction n'est pas valide
+        if verbose:
+            print(f"Données manquantes ou invalides pour ({lons[idx[0]]}, {lats[idx[0]]}) à {age} Ma")
+    else:
+        # Le serveur a omis des points : on ne peut plus associer les coordonnées
+        # aux points d'entrée, on recommence avec deux lots plus petits
+        half = len(idx) // 2
+        for part in (idx[:half], idx[half:]):
+            _reconstruct_batch(lons, lats, part, age, model, client, pallon, pallat, answered, verbose)
+
+
+def _reconstruct_local(lons, lats, groups, engine):
+    """Reconstruit des groupes de points avec le moteur local (plate_rotation.py)."""
+    if engine is None:
+        raise ValueError("backend='local' nécessite un moteur local : engine=LocalReconstructor(...)")
+    pallon = np.full(len(lons), np.nan)
+    pallat = np.full(len(lats), np.nan)
+    plates = engine.polygons.assign(lons, lats)  # Attribution aux plaques une seule fois pour tous les âges
+    for age, model, rows in groups:
+        pallon[rows], pallat[rows] = engine.reconstruct(lons[rows], lats[rows], age, plates=plates[rows])
+    return pallon, pallat
+
+
+def _reconstruct_groups(lons, lats, groups, client=None, url=GPLATES_URL, max_points=MAX_POINTS,
+                        max_url_length=MAX_URL_LENGTH, cache=None, progress=None, verbose=False,
+                        backend='web', engine=None):
+    """
+    Reconstruit des groupes de points [(âge, modèle, indices), ...].
+    Les lots de tous les groupes sont envoyés ensemble par le client (requêtes simultanées).
+    """
+    lons = np.asarray(lons, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    if backend == 'local':
+        return _reconstruct_local(lons, lats, groups, engine)
+    if backend != 'web':
+        raise ValueError(f"backend inconnu : {backend!r} (choisir 'web' ou 'local')")
+
+    pallon = np.full(len(lons), np.nan)
+    pallat = np.full(len(lats), np.nan)
+    answered = np.zeros(len(lons), dtype=bool)
+
+    tasks = []
+    pending = []
+    for age, model, rows in groups:
+        # Les points sans coordonnées valides ne sont pas envoyés
+        rows = rows[np.isfinite(lons[rows]) & np.isfinite(lats[rows])]
+
+        # Points déjà reconstruits lors d'une exécution précédente
+        if cache is not None and len(rows):
+            cached_lon, cached_lat, found = cache.get(lons[rows], lats[rows], age, model)
+            pallon[rows[found]], pallat[rows[found]] = cached_lon[found], cached_lat[found]
+            rows = rows[~found]
+
+        pending.append((age, model, rows))
+        for batch in make_batches(lons[rows], lats[rows], max_points, max_url_length):
+            tasks.append((age, model, rows[batch]))
+
+    own_client = client is None
+    if own_client:
+        client = GPlatesClient(url)
+    try:
+        def run(task):
+            age, model, idx = task
+            _reconstruct_batch(lons, lats, idx, age, model, client, pallon, pallat, answered, verbose)
+        done = client.map(run, tasks)
+        if progress is not None:
+            done = progress(done, total=len(tasks), desc="Reconstruction")
+        for _ in done:
+            pass
+    finally:
+        if own_client:
+            client.close()
+
+    # Seules les réponses de l'API sont enregistrées (pas les erreurs réseau)
+    if cache is not None:
+        for age, model, rows in pending:
+            new = rows[answered[rows]]
+            if len(new):
+                cache.put(lons[new], lats[new], age, model, pallon[new], pallat[new])
+    return pallon, pallat
+
+
+def reconstruct_points(lons, lats, age, model=DEFAULT_MODEL, url=GPLATES_URL, max_points=MAX_POINTS,
+                       max_url_length=MAX_URL_LENGTH, client=None, cache=None, progress=None, verbose=False,
+                       backend='web', engine=None):
+    """
+    Reconstruit les coordonnées paléogéographiques de nombreux points à un âge donné.
+
+    Les points sont envoyés par lots (une requête pour jusqu'à `max_points`
+    points) au lieu d'une requête par point, plusieurs lots à la fois.
+
+    Paramètres :
+        lons, lats (array-like) : Longitudes et latitudes modernes (degrés décimaux, WGS84).
+        age (float) : Âge de reconstruction (Ma).
+        model (str) : Modèle de plaques tectoniques (ex. "MULLER2022").
+        url (str) : URL du service `reconstruct_points` (si client n'est pas donné).
+        max_points (int) : Nombre maximal de points par requête.
+        max_url_length (int) : Longueur maximale du paramètre `points` (caractères).
+        client (GPlatesClient) : Client HTTP (requêtes simultanées, débit adaptatif,
+            nouvelles tentatives). None = client par défaut sur `url`.
+        cache (ReconstructionCache) : Cache persistant (paleo_cache.py) : seuls les
+            points absents du cache sont envoyés, et les résultats du cache sont
+            renvoyés même si le service est injoignable.
+        progress (callable) : Barre de progression optionnelle sur les lots (ex. tqdm).
+        verbose (bool) : Affiche les points non reconstruits.
+        backend (str) : 'web' (API GPlates) ou 'local' (moteur hors ligne).
+        engine (LocalReconstructor) : Moteur local de plate_rotation.py (backend='local') ;
+            le modèle est alors celui de ses fichiers de rotations et de polygones.
+
+    Retour :
+        pallon, pallat (ndarray) : Coordonnées paléo, dans l'ordre des points
+            d'entrée (NaN pour les points non reconstruits).
+    """
+    rows = np.arange(len(lons))
+    return _reconstruct_groups(lons, lats, [(age, model, rows)], client, url, max_points, max_url_length,
+                               cache, progress, verbose, backend, engine)
+
+
+### ======================== Tables (one age per row) =========================== ###
+
+def to_float(column):
+    """
+    Convertit une colonne en float en une seule passe vectorisée.
+    Les virgules sont acceptées comme séparateur décimal ("-12,5" -> -12.5) ;
+    les valeurs invalides deviennent NaN.
+    """
+    column = pd.Series(column)
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype(float)
+    return pd.to_numeric(column.astype(str).str.replace(',', '.', regex=False).str.strip(), errors='coerce')
+
+
+def reconstruct_table(data, lat_col='ModLat', lon_col='ModLon', age_col='Age', model=DEFAULT_MODEL,
+                      model_col='Model', **kwargs):
+    """
+    Reconstruit les coordonnées paléo d'un tableau dont chaque ligne a son propre âge.
+
+    Les lignes sont regroupées par (âge, modèle) : une seule série de requêtes
+    par lots est envoyée par groupe (les lots de tous les groupes partent en
+    parallèle), puis les résultats sont replacés dans l'ordre des lignes d'origine.
+
+    Paramètres :
+        data (DataFrame) : Tableau d'entrée (virgules décimales acceptées).
+        lat_col, lon_col, age_col (str) : Noms des colonnes latitude, longitude et âge.
+        model (str) : Modèle de plaques utilisé si le tableau n'a pas de colonne `model_col`.
+        model_col (str) : Colonne optionnelle donnant le modèle de chaque ligne.
+        **kwargs : Options de reconstruct_points (backend, engine, url, max_points, client,
+            cache, progress, ...).
+
+    Retour :
+        pallat, pallon (ndarray) : Latitudes et longitudes paléo, dans l'ordre
+            des lignes (NaN pour les lignes invalides ou non reconstruites).
+    """
+    lats = to_float(data[lat_col]).to_numpy()
+    lons = to_float(data[lon_col]).to_numpy()
+    ages = to_float(data[age_col]).to_numpy()
+    models = data[model_col].astype(str).to_numpy() if model_col in data.columns else np.full(len(data), model)
+
+    # Indices des lignes de chaque groupe (âge, modèle) ; les âges invalides (NaN) sont ignorés
+    keys = pd.DataFrame({'age': ages, 'model': models})
+    groups = keys.groupby(['age', 'model'], sort=False).indices
+    groups = [(age, group_model, rows) for (age, group_model), rows in groups.items()]
+
+    pallon, pallat = _reconstruct_groups(lons, lats, groups, **kwargs)
+    return pallat, pallon
+
+
+### ======================== Streaming (large files) =========================== ###
+
+def _save_checkpoint(path, rows_done, output_size):
+    """Écrit le point de reprise (fichier temporaire puis renommage, jamais à moitié écrit)."""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"rows_done": rows_done, "output_size": output_size}, f)
+    os.replace(tmp, path)
+
+
+def reconstruct_file(input_path, output_path, chunksize=10000, checkpoint_path=None, sep=r"\s+", **kwargs):
+    """
+    Reconstruit un grand fichier de coordonnées par morceaux, avec reprise après interruption.
+
+    Le fichier d'entrée est lu par blocs de `chunksize` lignes ; chaque bloc
+    est reconstruit (reconstruct_table) puis ajouté au fichier de sortie, et un
+    point de reprise enregistre le nombre de lignes terminées. Si le script est
+    relancé après un arrêt, il reprend après la dernière ligne terminée.
+    La mémoire utilisée ne dépend que de `chunksize`, pas de la taille du fichier.
+
+    Paramètres :
+        input_path (str) : Fichier d'entrée (colonnes ModLat, ModLon, Age, ...).
+        output_path (str) : Fichier de sortie (colonnes d'origine + PalLat, PalLon,
+            séparées par des tabulations).
+        chunksize (int) : Nombre de lignes traitées à la fois.
+        checkpoint_path (str) : Fichier de reprise (par défaut output_path + ".checkpoint").
+        sep (str) : Séparateur des colonnes du fichier d'entrée.
+        **kwargs : Options de reconstruct_table (lat_col, model, client, cache, backend, ...).
+
+    Retour :
+        rows_done (int) : Nombre total de lignes reconstruites.
+    """
+    if checkpoint_path is None:
+        checkpoint_path = output_path + ".checkpoint"
+
+    rows_done = 0
+    if os.path.exists(checkpoint_path) and os.path.exists(output_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        rows_done = checkpoint["rows_done"]
+        # Les lignes écrites après le dernier point de reprise sont supprimées (elles seront refaites)
+        with open(output_path, "r+b") as f:
+            f.truncate(checkpoint["output_size"])
+        print(f"Reprise après la ligne {rows_done} ({output_path})")
+
+    # Les lignes déjà terminées sont sautées (on garde la ligne d'en-tête)
+    reader = pd.read_csv(input_path, sep=sep, engine="python", dtype=str, chunksize=chunksize,
+                         skiprows=range(1, rows_done + 1))
+    for chunk in reader:
+        chunk = chunk.reset_index(drop=True)
+        chunk["PalLat"], chunk["PalLon"] = reconstruct_table(chunk, **kwargs)
+
+        with open(output_path, "w" if rows_done == 0 else "a", newline="") as f:
+            chunk.to_csv(f, index=False, sep="\t", header=(rows_done == 0), lineterminator="\n")
+            f.flush()
+            os.fsync(f.fileno())
+            output_size = f.tell()
+        rows_done += len(chunk)
+        _save_checkpoint(checkpoint_path, rows_done, output_size)
+
+    # Fichier terminé : le point de reprise n'est plus utile
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return rows_done
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 18:11:57 2026
+
+@author: nthar
+"""
+
+"""
+Author: Nicolas Tharaud : nicolas.tharaud@lsce.ipsl.fr
+Description:
+------------
+Moteur local (hors ligne) de reconstruction paléogéographique, alternative
+à l'API web de GPlates.
+
+Il utilise :
+- un fichier de rotations GPlates (.rot), c'est-à-dire une table de pôles
+  d'Euler (rotations finies) de chaque plaque par rapport à une autre ;
+- des polygones de plaques statiques (GeoJSON exporté par GPlates, avec la
+  propriété PLATEID1) pour attribuer chaque point moderne à une plaque.
+
+Les points sont attribués aux plaques à l'aide d'un index spatial (grille
+de cellules), puis les rotations finies interpolées à l'âge demandé sont
+appliquées à tous les points d'un coup (calcul vectorisé NumPy), ce qui
+permet de reconstruire des millions de points par seconde.
+
+-------------------------------------------------------------------------------
+FORMAT DU FICHIER DE ROTATIONS (.rot)
+-------------------------------------------------------------------------------
+
+Une rotation finie par ligne :
+
+    plaque  âge  latitude_pôle  longitude_pôle  angle  plaque_fixe  ! commentaire
+
+Exemple :
+
+    101   0.0   90.0    0.0   0.0   0  ! Amérique du Nord
+    101  10.0   80.5  140.2   2.6   0
+===============================================================================
+"""
+
+### ======================== Libraries =========================== ###
+
+import json
+import numpy as np
+from matplotlib.path import Path
+
+
+### ======================== Quaternions =========================== ###
+
+def pole_to_quaternion(lat, lon, angle):
+    """Rotation finie (pôle d'Euler en degrés, angle en degrés) -> quaternion unitaire (w, x, y, z)."""
+    lat, lon, half = np.radians(lat), np.radians(lon), np.radians(angle) / 2
+    axis = np.array([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+    return np.concatenate([[np.cos(half)], np.sin(half) * axis])
+
+
+def quaternion_multiply(q1, q2):
+    """Composition de rotations : q1 * q2 applique d'abord q2 puis q1."""
+    w1, x1, y1, z1 = q1
+    w2, x2, y2, z2 = q2
+    return np.array([w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+                     w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+                     w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+                     w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2])
+
+
+def quaternion_slerp(q0, q1, fraction):
+    """Interpolation sphérique entre deux rotations finies (comme GPlates)."""
+    dot = np.dot(q0, q1)
+    if dot < 0:            # Chemin le plus court
+        q1, dot = -q1, -dot
+    if dot > 0.9995:       # Rotations presque identiques : interpolation linéaire
+        q = q0 + fraction * (q1 - q0)
+        return q / np.linalg.norm(q)
+    theta = np.arccos(dot)
+    return (np.sin((1 - fraction) * theta) * q0 + np.sin(fraction * theta) * q1) / np.sin(theta)
+
+
+def quaternion_to_matrix(q):
+    """Quaternion unitaire -> matrice de rotation 3x3."""
+    w, x, y, z = q
+    return np.array([[1 - 2 * (y * y + z * z), 2 * (x * y - w * z),     2 * (x * z + w * y)],
+                     [2 * (x * y + w * z),     1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+                     [2 * (x * z - w * y),     2 * (y * z + w * x),     1 - 2 * (x * x + y * y)]])
+
+
+IDENTITY = np.array([1.0, 0.0, 0.0, 0.0])
+
+
+### ======================== Rotation model =========================== ###
+
+class RotationModel:
+    """
+    Table de rotations finies d'un fichier .rot et calcul des rotations totales.
+
+    Paramètres :
+        path (str) : Fichier de rotations GPlates (.rot).
+        anchor (int) : Plaque de référence (0 = référentiel absolu du modèle).
+    """
+
+    def __init__(self, path, anchor=0):
+        self.anchor = anchor
+        self.sequences = {}  # plaque -> liste de (âge, quaternion, plaque_fixe), triée par âge
+        with open(path, 'r') as file:
+            for line in file:
+                fields = line.split('!', 1)[0].split()
+                if len(fields) < 6:
+                    continue
+                plate, age, lat, lon, angle, fixed = fields[:6]
+                plate, fixed = int(plate), int(fixed)
+                if plate == 999:  # Lignes de commentaire de GPlates
+                    continue
+                q = pole_to_quaternion(float(lat), float(lon), float(angle))
+                self.sequences.setdefault(plate, []).append((float(age), q, fixed))
+        for sequence in self.sequences.values():
+            sequence.sort(key=lambda entry: entry[0])
+        self._memo = {}
+
+    def relative_rotation(self, plate, age):
+        """
+        Rotation finie de `plate` par rapport à sa plaque fixe à l'âge donné,
+        interpolée entre les deux rotations de la table qui encadrent cet âge.
+
+        Retour :
+            (quaternion, plaque_fixe), ou None si l'âge n'est pas couvert.
+        """
+        sequence = self.sequences.get(plate)
+        if not sequence:
+            return None
+        for (age0, q0, fixed0), (age1, q1, fixed1) in zip(sequence[:-1], sequence[1:]):
+            # Une rotation ne s'interpole qu'entre deux lignes de la même plaque fixe
+            if age0 <= age <= age1 and fixed0 == fixed1:
+                fraction = 0.0 if age1 == age0 else (age - age0) / (age1 - age0)
+                return quaternion_slerp(q0, q1, fraction), fixed0
+        if len(sequence) == 1 and sequence[0][0] == age:
+            return sequence[0][1], sequence[0][2]
+        return None
+
+    def total_rotation(self, plate, age):
+        """
+        Rotation totale de `plate` par rapport à la plaque de référence :
+        composition des rotations relatives le long de la chaîne des plaques fixes.
+        Retour : quaternion, ou None si une rotation de la chaîne manque.
+        """
+        key = (plate, age)
+        if key in self._memo:
+            return self._memo[key]
+        if plate == self.anchor:
+            q = IDENTITY
+        else:
+            relative = self.relative_rotation(plate, age)
+            if relative is None:
+                q = None
+            else:
+                q_rel, fixed = relative
+                # Protection contre une chaîne de plaques circulaire
+                self._memo[key] = None
+                q_fixed = self.total_rotation(fixed, age)
+                q = None if q_fixed is None else quaternion_multiply(q_fixed, q_rel)
+        self._memo[key] = q
+        return q
+
+
+### ======================== Plate polygons =========================== ###
+
+def _unwrap_ring(lons):
+    """
+    Longitudes d'un contour rendues continues (sans saut de 360° à l'antiméridien),
+    par exemple 170, 179, -179, -170 -> 170, 179, 181, 190. Les côtés qui longent
+    le bord de la carte (de -180 à 180°, polygones déjà découpés à l'antiméridien
+    ou contenant un pôle) et les contours qui font le tour du globe sont laissés
+    tels quels.
+    """
+    jumps = np.abs(np.diff(lons)) > 180
+    along_edge = (np.abs(lons[:-1]) == 180) & (np.abs(lons[1:]) == 180)
+    if not (jumps & ~along_edge).any():
+        return lons
+    unwrapped = np.degrees(np.unwrap(np.radians(lons)))
+    return unwrapped if abs(unwrapped[-1] - unwrapped[0]) < 180 else lons
+
+
+class PlatePolygons:
+    """
+    Polygones statiques des plaques et attribution des points à une plaque.
+
+    Un index spatial (grille de cellules de `cell` degrés) limite le test
+    point-dans-polygone aux points situés dans la boîte englobante de chaque
+    polygone. Les longitudes des points peuvent être données dans [-180, 180)
+    ou [0, 360), et les polygones peuvent traverser l'antiméridien : leur boîte
+    englobante est alors découpée de part et d'autre.
+
+    Paramètres :
+        path (str) : Fichier GeoJSON (FeatureCollection de Polygon/MultiPolygon)
+            dont les propriétés contiennent l'identifiant de plaque.
+        plate_key (str) : Nom de la propriété de l'identifiant (PLATEID1 pour
+            les exports GPlates).
+        cell (float) : Taille des cellules de l'index spatial (degrés).
+    """
+
+    def __init__(self, path, plate_key='PLATEID1', cell=10.0):
+        self.cell = cell
+        self.polygons = []  # liste de (plaque, Path, lon_min, lon_max, lat_min, lat_max)
+        with open(path, 'r') as file:
+            collection = json.load(file)
+        for feature in collection['features']:
+            plate = int(feature['properties'][plate_key])
+            geometry = feature['geometry']
+            rings = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+            for polygon in rings:
+                exterior = np.asarray(polygon[0], dtype=float)[:, :2]  # Les trous sont ignorés
+                exterior[:, 0] = _unwrap_ring(exterior[:, 0])
+                self.polygons.append((plate, Path(exterior),
+                                      exterior[:, 0].min(), exterior[:, 0].max(),
+                                      exterior[:, 1].min(), exterior[:, 1].max()))
+
+    def assign(self, lons, lats):
+        """
+        Identifiant de plaque de chaque point (-1 si le point n'est dans aucun polygone
+        ou si ses coordonnées sont manquantes, NaN).
+        En cas de recouvrement, le premier polygone du fichier est retenu.
+        """
+        lons = (np.asarray(lons, dtype=float) + 180) % 360 - 180  # Longitudes ramenées dans [-180, 180)
+        lats = np.asarray(lats, dtype=float)
+        plates = np.full(len(lons), -1, dtype=np.int64)
+
+        # Index spatial : points triés par cellule de la grille
+        # Les points sans coordonnées (NaN) reçoivent la cellule -1, jamais candidate
+        finite = np.isfinite(lons) & np.isfinite(lats)
+        ncols = int(np.ceil(360 / self.cell))
+        col = np.clip(((np.where(finite, lons, 0) + 180) // self.cell).astype(np.int64), 0, ncols - 1)
+        row = np.clip(((np.where(finite, lats, 0) + 90) // self.cell).astype(np.int64), 0, int(np.ceil(180 / self.cell)) - 1)
+        cell_id = np.where(finite, row * ncols + col, -1)
+        order = np.argsort(cell_id, kind='stable')
+        sorted_id = cell_id[order]
+        points = np.column_stack([lons, lats])
+
+        for plate, path, lon_min, lon_max, lat_min, lat_max in self.polygons:
+            r0, r1 = [int(np.clip((y + 90) // self.cell, 0, np.ceil(180 / self.cell) - 1)) for y in (lat_min, lat_max)]
+            # Boîte englobante découpée en morceaux dans [-180, 180) : un polygone qui
+            # traverse l'antiméridien (longitudes au-delà de 180°) est testé avec les
+            # points décalés de 360°
+            for shift in (-360, 0, 360):
+                west, east = max(lon_min - shift, -180), min(lon_max - shift, 180)
+                if west >= east:
+                    continue
+                c0, c1 = [int(np.clip((x + 180) // self.cell, 0, ncols - 1)) for x in (west, east)]
+                # Pour chaque ligne de la grille, les cellules c0..c1 sont contiguës dans sorted_id
+                candidates = [order[np.searchsorted(sorted_id, r * ncols + c0, 'left'):
+                                    np.searchsorted(sorted_id, r * ncols + c1, 'right')] for r in range(r0, r1 + 1)]
+                candidates = np.concatenate(candidates) if candidates else np.empty(0, dtype=np.int64)
+                candidates = candidates[plates[candidates] < 0]
+                if len(candidates):
+                    inside = path.contains_points(points[candidates] + [shift, 0])
+                    plates[candidates[inside]] = plate
+        return plates
+
+
+### ======================== Reconstruction =========================== ###
+
+class LocalReconstructor:
+    """
+    Reconstruction hors ligne : attribution des points aux plaques puis
+    rotation de tous les points par la rotation totale de leur plaque.
+
+    Paramètres :
+        rotation_file (str) : Fichier de rotations (.rot).
+        polygons_file (str) : Polygones des plaques (GeoJSON).
+        anchor (int) : Plaque de référence.
+        plate_key (str) : Propriété GeoJSON contenant l'identifiant de plaque.
+    """
+
+    def __init__(self, rotation_file, polygons_file, anchor=0, plate_key='PLATEID1'):
+        self.rotations = RotationModel(rotation_file, anchor)
+        self.polygons = PlatePolygons(polygons_file, plate_key)
+
+    def reconstruct(self, lons, lats, age, plates=None):
+        """
+        Reconstruit les coordonnées paléo de points modernes.
+
+        Paramètres :
+            lons, lats (array-like) : Coordonnées modernes (degrés décimaux).
+            age (float) : Âge de reconstruction (Ma).
+            plates (array-like) : Identifiants de plaque déjà connus (optionnel,
+                évite de refaire l'attribution pour plusieurs âges).
+
+        Retour :
+            pallon, pallat (ndarray) : Coordonnées paléo (NaN pour les points hors
+                des polygones ou dont la plaque n'a pas de rotation à cet âge).
+        """
+        lons = (np.asarray(lons, dtype=float) + 180) % 360 - 180  # Longitudes ramenées dans [-180, 180)
+        lats = np.asarray(lats, dtype=float)
+        if plates is None:
+            plates = self.polygons.assign(lons, lats)
+
+        # Une matrice de rotation par plaque, puis une par point (indexation)
+        unique, inverse = np.unique(plates, return_inverse=True)
+        matrices = np.full((len(unique), 3, 3), np.nan)
+        for k, plate in enumerate(unique):
+            q = self.rotations.total_rotation(int(plate), float(age)) if plate >= 0 else None
+            if q is not None:
+                matrices[k] = quaternion_to_matrix(q)
+
+        # Vecteurs unitaires des points, rotation, retour en latitude/longitude
+        lon_rad, lat_rad = np.radians(lons), np.radians(lats)
+        xyz = np.column_stack([np.cos(lat_rad) * np.cos(lon_rad),
+                               np.cos(lat_rad) * np.sin(lon_rad),
+                               np.sin(lat_rad)])
+        rotated = np.einsum('nij,nj->ni', matrices[inverse.ravel()], xyz)
+        pallat = np.degrees(np.arcsin(np.clip(rotated[:, 2], -1, 1)))
+        pallon = np.degrees(np.arctan2(rotated[:, 1], rotated[:, 0]))
+        return pallon, pallat